@@ -2,7 +2,11 @@ import os
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from routes import router as api_router
-from db import Base, engine
+from db import engine
+from db.migraciones import comprobar_esquema
+from services.paginacion import CABECERA_CURSOR
+from services.trabajos_importacion import iniciar_latido, detener_latido
+from services.importacion import cerrar_pool
 from routes.auth import router as auth_router
 from routes.importacion import router as import_router
 from routes.perfil import router as perfil_router
@@ -13,12 +17,21 @@ app.include_router(auth_router)
 app.include_router(import_router)
 app.include_router(perfil_router)
 
-# Crear la base de datos al arrancar si no existe
+# Comprobar al arrancar que el esquema está en la última versión (python -m db.migraciones)
+# y cerrar las importaciones en segundo plano cuyo proceso ya no existe
 @app.on_event("startup")
 def startup_event():
-    print("Verificando si las tablas existen...")
-    Base.metadata.create_all(bind=engine)
-    print("Tablas verificadas o creadas correctamente.")
+    version = comprobar_esquema(engine)
+    print(f"Esquema de la base de datos en la versión {version}.")
+
+    interrumpidos = iniciar_latido()
+    if interrumpidos:
+        print(f"{interrumpidos} importaciones cuyo proceso terminó marcadas como error.")
+
+@app.on_event("shutdown")
+def shutdown_event():
+    detener_latido()
+    cerrar_pool()
 
 # Incluir todas las rutas de la API
 app.include_router(api_router)
@@ -30,6 +43,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[CABECERA_CURSOR, "ETag"],
 )
 
 # Ruta raíz para prueba
@@ -0,0 +1,99 @@
+"""
+Compara la validación fila por fila (validar_fecha / validar_monto / validar_categoria)
+con el parseo por columnas de services.parseo sobre un CSV de gastos generado.
+
+Uso: python benchmarks/bench_importacion_parseo.py [filas] [repeticiones]
+"""
+import csv
+import io
+import os
+import random
+import sys
+import time
+from datetime import date, datetime, timedelta
+from itertools import islice
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.importacion import TAMANO_LOTE, validar_lote
+
+# Validadores fila por fila del importador original, como referencia de la comparación
+def validar_fecha(fecha_str):
+    try:
+        return datetime.strptime(fecha_str, "%Y-%m-%d").date()
+    except ValueError:
+        return None
+
+def validar_monto(monto_str):
+    try:
+        # Reemplazar coma por punto y eliminar espacios
+        monto_str = monto_str.replace(',', '.').strip()
+        monto = float(monto_str)
+        return monto if monto >= 0 else None
+    except (ValueError, TypeError):
+        return None
+
+def validar_categoria(categoria):
+    return categoria.strip() if categoria else None
+
+def generar_csv(filas: int) -> str:
+    random.seed(42)
+    inicio = date(2000, 1, 1)
+    salida = io.StringIO()
+    salida.write("date,amount,category\n")
+    for i in range(filas):
+        fecha = inicio + timedelta(days=i)
+        monto = f"{random.uniform(1, 5000):.2f}"
+        if i % 3 == 0:
+            monto = monto.replace('.', ',')
+        salida.write(f"{fecha.isoformat()},{monto},{random.choice(['ropa', 'salud', 'otros'])}\n")
+    return salida.getvalue()
+
+def por_fila(contenido: str):
+    # Bucle equivalente al importador original
+    errores, registros = [], []
+    for idx, row in enumerate(csv.DictReader(io.StringIO(contenido)), 1):
+        fecha = validar_fecha(row['date'])
+        if not fecha:
+            errores.append(f"Línea {idx}: Fecha inválida (formato YYYY-MM-DD)")
+            continue
+        monto = validar_monto(row['amount'])
+        if monto is None:
+            errores.append(f"Línea {idx}: Monto inválido")
+            continue
+        categoria = validar_categoria(row['category'])
+        if not categoria:
+            errores.append(f"Línea {idx}: Categoría inválida")
+            continue
+        registros.append({'fecha': fecha, 'monto': monto, 'categoria': categoria})
+    return registros, errores
+
+def por_columnas(contenido: str):
+    errores, registros = [], []
+    filas = enumerate(csv.DictReader(io.StringIO(contenido)), 1)
+    while lote := list(islice(filas, TAMANO_LOTE)):
+        registros.extend(validar_lote(lote, 'expense', errores))
+    return registros, errores
+
+def medir(funcion, contenido: str, repeticiones: int):
+    mejor = float('inf')
+    resultado = None
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        resultado = funcion(contenido)
+        mejor = min(mejor, time.perf_counter() - inicio)
+    return mejor, resultado
+
+if __name__ == "__main__":
+    filas = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    repeticiones = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    contenido = generar_csv(filas)
+
+    t_fila, r_fila = medir(por_fila, contenido, repeticiones)
+    t_columnas, r_columnas = medir(por_columnas, contenido, repeticiones)
+    assert r_fila == r_columnas, "Los dos caminos deben producir el mismo resultado"
+
+    print(f"Filas: {filas} (mejor de {repeticiones})")
+    print(f"Fila por fila:  {t_fila:.3f} s  ({filas / t_fila:,.0f} filas/s)")
+    print(f"Por columnas:   {t_columnas:.3f} s  ({filas / t_columnas:,.0f} filas/s)")
+    print(f"Aceleración:    {t_fila / t_columnas:.2f}x")
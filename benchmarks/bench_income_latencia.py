@@ -0,0 +1,114 @@
+"""
+Prueba de carga de las rutas de ingresos: lanza peticiones concurrentes a
+/api/incomes/{user_id}/current-month y POST /api/incomes/{user_id} mientras mide la
+latencia de GET / (que no toca la base). Si los handlers async bloquean el event
+loop con E/S síncrona, la latencia de cola de GET / se dispara.
+
+Por defecto levanta la app en el mismo proceso sobre una base SQLite temporal.
+Con --url se prueba un servidor ya levantado (uvicorn), lo que permite comparar
+dos versiones del código antes y después del cambio.
+
+Uso: python benchmarks/bench_income_latencia.py [--url http://localhost:8000] [--concurrencia 50]
+                                                [--peticiones 2000] [--escrituras 0.1]
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+USUARIOS = 20
+
+def percentiles(latencias):
+    ordenadas = sorted(latencias)
+    def p(q):
+        return 1000 * ordenadas[min(len(ordenadas) - 1, int(q * len(ordenadas)))]
+    return f"p50={p(0.50):.1f}ms p95={p(0.95):.1f}ms p99={p(0.99):.1f}ms max={1000 * ordenadas[-1]:.1f}ms"
+
+def preparar_base():
+    # Debe ejecutarse antes de importar la app para que use la base temporal
+    ruta = os.path.join(tempfile.mkdtemp(), "bench.db")
+    os.environ["DATABASE_URL"] = f"sqlite:///{ruta}"
+    from db.db import SessionLocal, engine
+    from db.migraciones import aplicar_migraciones
+    from models import User, Income
+    aplicar_migraciones(engine)
+    db = SessionLocal()
+    hoy = date.today()
+    for user_id in range(1, USUARIOS + 1):
+        db.add(User(id=user_id, email=f"bench{user_id}@example.com", username=f"bench{user_id}", password="x"))
+        for dias in range(0, 365 * 3, 3):
+            db.add(Income(user_id=user_id, date=hoy - timedelta(days=dias), amount=random.randint(100, 2000)))
+    db.commit()
+    db.close()
+
+async def peticion(cliente, latencias, metodo, ruta, **kwargs):
+    inicio = time.perf_counter()
+    respuesta = await cliente.request(metodo, ruta, **kwargs)
+    latencias.append(time.perf_counter() - inicio)
+    return respuesta.status_code
+
+async def ejecutar(cliente, concurrencia: int, peticiones: int, escrituras: float):
+    cabeceras = {"Authorization": "Bearer bench"}
+    lat_ingresos, lat_raiz = [], []
+    semaforo = asyncio.Semaphore(concurrencia)
+    terminado = asyncio.Event()
+    siguiente_dia = iter(range(1, peticiones + 1))
+
+    async def trabajo(i):
+        async with semaforo:
+            user_id = random.randint(1, USUARIOS)
+            if random.random() < escrituras:
+                fecha = date(2100, 1, 1) + timedelta(days=next(siguiente_dia))
+                await peticion(cliente, lat_ingresos, "POST", f"/api/incomes/{user_id}",
+                               json={"date": fecha.isoformat(), "amount": 10}, headers=cabeceras)
+            else:
+                await peticion(cliente, lat_ingresos, "GET", f"/api/incomes/{user_id}/current-month",
+                               headers=cabeceras)
+
+    async def sonda():
+        while not terminado.is_set():
+            await peticion(cliente, lat_raiz, "GET", "/")
+            await asyncio.sleep(0.005)
+
+    tarea_sonda = asyncio.create_task(sonda())
+    inicio = time.perf_counter()
+    await asyncio.gather(*(trabajo(i) for i in range(peticiones)))
+    duracion = time.perf_counter() - inicio
+    terminado.set()
+    await tarea_sonda
+
+    print(f"Peticiones de ingresos: {peticiones} con concurrencia {concurrencia} en {duracion:.2f}s "
+          f"({peticiones / duracion:,.0f} req/s)")
+    print(f"  ingresos: {percentiles(lat_ingresos)}")
+    print(f"  GET /:    {percentiles(lat_raiz)}  (media {1000 * statistics.mean(lat_raiz):.1f}ms)")
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", default=None, help="Servidor a probar; por defecto la app en proceso")
+    parser.add_argument("--concurrencia", type=int, default=50)
+    parser.add_argument("--peticiones", type=int, default=2000)
+    parser.add_argument("--escrituras", type=float, default=0.1, help="Fracción de peticiones POST")
+    args = parser.parse_args()
+
+    if args.url:
+        async with httpx.AsyncClient(base_url=args.url, timeout=60) as cliente:
+            await ejecutar(cliente, args.concurrencia, args.peticiones, args.escrituras)
+        return
+
+    preparar_base()
+    from app import app
+    transporte = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transporte, base_url="http://bench", timeout=60) as cliente:
+        await ejecutar(cliente, args.concurrencia, args.peticiones, args.escrituras)
+
+if __name__ == "__main__":
+    asyncio.run(main())
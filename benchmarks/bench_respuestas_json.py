@@ -0,0 +1,132 @@
+"""
+Compara la serialización por defecto de listados e histórico (validación con el
+response_model + jsonable_encoder + json) con el modo RESPUESTAS_RAPIDAS (filas y series
+serializadas directamente a bytes con orjson, o json si no está instalado) sobre cargas
+de 10.000 elementos.
+
+1. Serialización aislada: el mismo contenido por ambos caminos, sin base ni HTTP.
+2. Extremo a extremo: GET /datos/gastos/{user_id}?limit=10000 sobre una base SQLite
+   temporal, alternando el modo en el mismo proceso. Se comprueba además que ambos modos
+   devuelven exactamente los mismos bytes.
+
+Uso: python benchmarks/bench_respuestas_json.py [--filas 10000] [--repeticiones 30]
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+from typing import List
+
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+def percentiles(tiempos):
+    ordenados = sorted(tiempos)
+    def p(q):
+        return 1000 * ordenados[min(len(ordenados) - 1, int(q * len(ordenados)))]
+    return f"p50={p(0.50):7.2f}ms p95={p(0.95):7.2f}ms"
+
+def medir(funcion, repeticiones: int):
+    funcion()  # calentamiento
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion()
+        tiempos.append(time.perf_counter() - inicio)
+    return tiempos
+
+def preparar_base(filas: int):
+    # Debe ejecutarse antes de importar la app para que use la base temporal
+    ruta = os.path.join(tempfile.mkdtemp(), "bench.db")
+    os.environ["DATABASE_URL"] = f"sqlite:///{ruta}"
+    os.environ["LISTADOS_PAGINA_MAX"] = str(filas)
+    os.environ["HISTORIAL_CACHE_MAX"] = "0"
+    from db.db import SessionLocal, engine
+    from db.migraciones import aplicar_migraciones
+    from models import User, Expense
+    aplicar_migraciones(engine)
+    db = SessionLocal()
+    db.add(User(id=1, email="bench@example.com", username="bench", password="x"))
+    inicio = date.today() - timedelta(days=filas)
+    db.add_all(
+        Expense(user_id=1, date=inicio + timedelta(days=i), amount=random.randint(1, 1000) + 0.5,
+                category=random.choice(["comida", "ocio", "otros"]))
+        for i in range(filas)
+    )
+    db.commit()
+    db.close()
+
+def serializacion(filas: int, repeticiones: int):
+    from fastapi.encoders import jsonable_encoder
+    from fastapi.responses import JSONResponse
+    from pydantic import TypeAdapter
+    from routes.expenses import COLUMNAS
+    from routes.finance_history import SERIE_MENSUAL
+    from services.respuestas import a_json, filas_a_dicts, orjson
+
+    hoy = date.today()
+    tuplas = [(hoy - timedelta(days=i), random.randint(1, 1000) + 0.5, "otros") for i in range(filas)]
+    listado = TypeAdapter(List[dict])
+    serie = [{"period": f"{2000 + i // 12}-{i % 12 + 1:02d}", "total": float(i)} for i in range(filas)]
+
+    def listado_defecto():
+        datos = [{"date": f, "amount": a, "category": c} for f, a, c in tuplas]
+        return JSONResponse(jsonable_encoder(listado.validate_python(datos))).body
+
+    def listado_rapido():
+        return a_json(filas_a_dicts(COLUMNAS, tuplas))
+
+    def serie_defecto():
+        return SERIE_MENSUAL.dump_json(SERIE_MENSUAL.validate_python(serie))
+
+    def serie_rapida():
+        return a_json(serie)
+
+    print(f"Serialización de {filas:,} elementos ({'orjson' if orjson else 'json'}):")
+    for nombre, defecto, rapido in [("listado", listado_defecto, listado_rapido),
+                                    ("histórico", serie_defecto, serie_rapida)]:
+        t_defecto = medir(defecto, repeticiones)
+        t_rapido = medir(rapido, repeticiones)
+        print(f"  {nombre:10} defecto {percentiles(t_defecto)} | rápido {percentiles(t_rapido)} | "
+              f"x{sorted(t_defecto)[len(t_defecto) // 2] / sorted(t_rapido)[len(t_rapido) // 2]:.1f}")
+
+async def extremo_a_extremo(filas: int, repeticiones: int):
+    import routes.expenses
+    from app import app
+
+    ruta = f"/datos/gastos/1?limit={filas}"
+    transporte = httpx.ASGITransport(app=app)
+    cuerpos = {}
+    print(f"GET {ruta}:")
+    async with httpx.AsyncClient(transport=transporte, base_url="http://bench") as cliente:
+        for modo in (False, True):
+            routes.expenses.RESPUESTAS_RAPIDAS = modo
+            cuerpos[modo] = (await cliente.get(ruta)).content
+            tiempos = []
+            for _ in range(repeticiones):
+                inicio = time.perf_counter()
+                respuesta = await cliente.get(ruta)
+                tiempos.append(time.perf_counter() - inicio)
+                assert respuesta.status_code == 200
+            print(f"  {'rápido' if modo else 'defecto':10} {percentiles(tiempos)} "
+                  f"({len(cuerpos[modo]) / 1024:,.0f} KiB)")
+    print(f"  mismas respuestas en ambos modos: {cuerpos[False] == cuerpos[True]}")
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--filas", type=int, default=10000)
+    parser.add_argument("--repeticiones", type=int, default=30)
+    args = parser.parse_args()
+
+    random.seed(42)
+    preparar_base(args.filas)
+    serializacion(args.filas, args.repeticiones)
+    asyncio.run(extremo_a_extremo(args.filas, args.repeticiones))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+"""
+Compara el rendimiento de SQLite con los PRAGMA por defecto y con SQLITE_PERFIL=rendimiento
+(WAL, synchronous=NORMAL, mmap, cache, temp_store y busy_timeout) bajo carga mixta de
+lecturas y escrituras, con varios workers de uvicorn compartiendo el mismo archivo.
+
+Para cada perfil se genera una base nueva, se levanta `uvicorn app:app --workers N` y se
+lanzan peticiones durante un tiempo fijo: lecturas de histórico, listados e ingresos del mes,
+y altas de gastos e ingresos.
+
+Uso: python benchmarks/bench_sqlite_perfil.py [--workers 4] [--concurrencia 32]
+                                              [--segundos 20] [--escrituras 0.2]
+"""
+import argparse
+import asyncio
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+from itertools import count
+
+import httpx
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+USUARIOS = 20
+PERFILES = {"defecto": "", "rendimiento": "rendimiento"}
+
+def preparar_base(ruta: str):
+    # Se siembra en un subproceso para que la app de cada perfil cree sus propios engines
+    codigo = f"""
+import random
+from datetime import date, timedelta
+from db.db import SessionLocal, engine
+from db.migraciones import aplicar_migraciones
+from models import User, Income, Expense
+from services.rollup import reconstruir
+aplicar_migraciones(engine)
+db = SessionLocal()
+hoy = date.today()
+random.seed(42)
+for user_id in range(1, {USUARIOS} + 1):
+    db.add(User(id=user_id, email=f"bench{{user_id}}@example.com", username=f"bench{{user_id}}", password="x"))
+    for dias in range(0, 365 * 3, 2):
+        fecha = hoy - timedelta(days=dias)
+        db.add(Income(user_id=user_id, date=fecha, amount=random.randint(100, 2000)))
+        db.add(Expense(user_id=user_id, date=fecha, amount=random.randint(10, 500), category="otros"))
+db.flush()
+reconstruir(db)
+db.commit()
+db.close()
+"""
+    entorno = dict(os.environ, DATABASE_URL=f"sqlite:///{ruta}")
+    subprocess.run([sys.executable, "-c", codigo], cwd=RAIZ, env=entorno, check=True)
+
+def percentil(valores, q):
+    ordenados = sorted(valores)
+    return 1000 * ordenados[min(len(ordenados) - 1, int(q * len(ordenados)))] if ordenados else 0.0
+
+async def esperar_servidor(url: str, proceso, limite: float = 30):
+    fin = time.monotonic() + limite
+    async with httpx.AsyncClient(base_url=url) as cliente:
+        while time.monotonic() < fin:
+            if proceso.poll() is not None:
+                raise RuntimeError("uvicorn terminó antes de estar listo")
+            try:
+                if (await cliente.get("/")).status_code == 200:
+                    return
+            except httpx.TransportError:
+                pass
+            await asyncio.sleep(0.2)
+    raise RuntimeError("uvicorn no respondió a tiempo")
+
+async def carga(url: str, concurrencia: int, segundos: float, escrituras: float):
+    cabeceras = {"Authorization": "Bearer bench"}
+    dias = count(1)
+    resultados = {"lectura": [], "escritura": []}
+    errores = {"lectura": 0, "escritura": 0}
+    fin = time.monotonic() + segundos
+
+    async def cliente_virtual(cliente):
+        while time.monotonic() < fin:
+            user_id = random.randint(1, USUARIOS)
+            if random.random() < escrituras:
+                clase = "escritura"
+                fecha = (date(2100, 1, 1) + timedelta(days=next(dias))).isoformat()
+                if random.random() < 0.5:
+                    peticion = cliente.post(f"/datos/gastos/{user_id}",
+                                            json={"amount": 10, "category": "otros", "expense_date": fecha})
+                else:
+                    peticion = cliente.post(f"/api/incomes/{user_id}", json={"date": fecha, "amount": 10},
+                                            headers=cabeceras)
+            else:
+                clase = "lectura"
+                peticion = random.choice([
+                    lambda: cliente.get(f"/history/summary/{user_id}", params={"periodo": "1y"}),
+                    lambda: cliente.get(f"/datos/gastos/{user_id}"),
+                    lambda: cliente.get(f"/api/incomes/{user_id}/current-month", headers=cabeceras),
+                ])()
+            inicio = time.perf_counter()
+            try:
+                respuesta = await peticion
+                ok = respuesta.status_code == 200
+            except httpx.HTTPError:
+                ok = False
+            if ok:
+                resultados[clase].append(time.perf_counter() - inicio)
+            else:
+                errores[clase] += 1
+
+    limites = httpx.Limits(max_connections=concurrencia)
+    async with httpx.AsyncClient(base_url=url, timeout=60, limits=limites) as cliente:
+        await asyncio.gather(*(cliente_virtual(cliente) for _ in range(concurrencia)))
+    return resultados, errores
+
+async def medir_perfil(nombre: str, perfil: str, args, puerto: int):
+    directorio = tempfile.mkdtemp()
+    ruta = os.path.join(directorio, "bench.db")
+    try:
+        preparar_base(ruta)
+        entorno = dict(os.environ, DATABASE_URL=f"sqlite:///{ruta}", SQLITE_PERFIL=perfil)
+        proceso = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "app:app", "--port", str(puerto),
+             "--workers", str(args.workers), "--log-level", "warning"],
+            cwd=RAIZ, env=entorno, stdout=subprocess.DEVNULL,
+        )
+        url = f"http://127.0.0.1:{puerto}"
+        try:
+            await esperar_servidor(url, proceso)
+            resultados, errores = await carga(url, args.concurrencia, args.segundos, args.escrituras)
+        finally:
+            proceso.terminate()
+            proceso.wait()
+    finally:
+        shutil.rmtree(directorio, ignore_errors=True)
+
+    total = sum(len(v) for v in resultados.values())
+    print(f"Perfil {nombre}: {total / args.segundos:,.0f} req/s correctas")
+    for clase in ("lectura", "escritura"):
+        lat = resultados[clase]
+        print(f"  {clase:9}: {len(lat):6} ok, {errores[clase]:4} errores, "
+              f"p50={percentil(lat, 0.50):.1f}ms p95={percentil(lat, 0.95):.1f}ms p99={percentil(lat, 0.99):.1f}ms")
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--concurrencia", type=int, default=32)
+    parser.add_argument("--segundos", type=float, default=20)
+    parser.add_argument("--escrituras", type=float, default=0.2, help="Fracción de peticiones de alta")
+    parser.add_argument("--puerto", type=int, default=8765)
+    args = parser.parse_args()
+
+    print(f"{args.workers} workers, concurrencia {args.concurrencia}, {args.segundos:.0f}s, "
+          f"{args.escrituras:.0%} escrituras")
+    for nombre, perfil in PERFILES.items():
+        await medir_perfil(nombre, perfil, args, args.puerto)
+
+if __name__ == "__main__":
+    asyncio.run(main())
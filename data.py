@@ -5,9 +5,10 @@ from models import (
     Base, User, Income, Expense, Saving, Investment,
     ExpenseGoal, SavingGoal, InvestmentGoal
 )
-from passlib.context import CryptContext
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-Base.metadata.create_all(bind=engine)
+from services.contrasenas import pwd_context
+from services.rollup import reconstruir
+from db.migraciones import aplicar_migraciones
+aplicar_migraciones(engine)
 
 def seed_data():
     db = SessionLocal()
@@ -75,6 +76,8 @@ def seed_data():
                 db.merge(ExpenseGoal(date=fecha_mes, user_id=user.id, value=meta_gasto))
                 db.merge(SavingGoal(date=fecha_mes, user_id=user.id, value=meta_ahorro))
                 db.merge(InvestmentGoal(date=fecha_mes, user_id=user.id, value=meta_inversion))
+        db.flush()
+        reconstruir(db, user.id)
         db.commit()
         print("Datos de prueba cargados correctamente.\n")
 
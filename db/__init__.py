@@ -1 +1 @@
-from .db import Base, engine, get_db, SessionLocal
\ No newline at end of file
+from .db import Base, engine, get_db, SessionLocal, obtener_async_engine, get_async_db, AsyncSessionLocal, estadisticas_pools
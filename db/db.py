@@ -1,16 +1,18 @@
 import os
+import threading
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from models import Base
+from .pool import opciones_engine, estadisticas_pool
+from .sqlite import configurar_sqlite
 
 # Ruta de la base de datos SQLite (archivo en el directorio actual)
 DATABASE_URL = os.getenv('DATABASE_URL', 'sqlite:///./app.db')
 
-# Crear engine de SQLAlchemy (en SQLite hay que deshabilitar el "check_same_thread")
-engine = create_engine(
-    DATABASE_URL,
-    connect_args={"check_same_thread": False}  # Sólo para SQLite
-)
+# Crear engine de SQLAlchemy; pool y connect_args dependen del backend (ver db/pool.py)
+engine = create_engine(DATABASE_URL, **opciones_engine(DATABASE_URL))
+configurar_sqlite(engine)
 
 # Configurar la sesión: no commit automático, no flush automático
 SessionLocal = sessionmaker(
@@ -24,4 +26,72 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+# Drivers asíncronos equivalentes a cada driver síncrono
+DRIVERS_ASYNC = {
+    'sqlite': 'sqlite+aiosqlite',
+    'postgresql': 'postgresql+asyncpg',
+    'mysql': 'mysql+aiomysql',
+}
+
+def async_url(url: str) -> str:
+    esquema, resto = url.split('://', 1)
+    backend = esquema.split('+', 1)[0]
+    return f"{DRIVERS_ASYNC.get(backend, esquema)}://{resto}"
+
+ASYNC_DATABASE_URL = os.getenv('ASYNC_DATABASE_URL', async_url(DATABASE_URL))
+
+# Paquete que instala cada driver asíncrono (solo aiosqlite está en requirements.txt)
+PAQUETES_ASYNC = {
+    'sqlite+aiosqlite': 'aiosqlite',
+    'postgresql+asyncpg': 'asyncpg',
+    'mysql+aiomysql': 'aiomysql',
+}
+
+_async_engine = None
+_AsyncSessionLocal = None
+_async_lock = threading.Lock()
+
+def obtener_async_engine():
+    """
+    Engine asíncrono para rutas async def: no bloquea el event loop durante la E/S. Se crea
+    en el primer uso, así que si falta el driver solo fallan las rutas asíncronas.
+    """
+    global _async_engine, _AsyncSessionLocal
+    if _async_engine is None:
+        with _async_lock:
+            if _async_engine is None:
+                try:
+                    motor = create_async_engine(
+                        ASYNC_DATABASE_URL, **opciones_engine(ASYNC_DATABASE_URL, asincrono=True)
+                    )
+                except ImportError as e:
+                    driver = ASYNC_DATABASE_URL.split('://', 1)[0]
+                    raise RuntimeError(
+                        f"Las rutas asíncronas necesitan el driver '{driver}', que no está instalado "
+                        f"({e}). Instala '{PAQUETES_ASYNC.get(driver, driver)}' o define ASYNC_DATABASE_URL."
+                    ) from e
+                configurar_sqlite(motor.sync_engine)
+                # expire_on_commit=False: los objetos siguen legibles tras el commit sin otra consulta
+                _AsyncSessionLocal = async_sessionmaker(
+                    bind=motor,
+                    autoflush=False,
+                    expire_on_commit=False
+                )
+                _async_engine = motor
+    return _async_engine
+
+def AsyncSessionLocal():
+    obtener_async_engine()
+    return _AsyncSessionLocal()
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+def estadisticas_pools():
+    return {
+        "sincrono": estadisticas_pool(engine),
+        "asincrono": estadisticas_pool(_async_engine.sync_engine) if _async_engine is not None else None,
+    }
@@ -0,0 +1,35 @@
+"""
+Crea en una base existente los índices declarados en los modelos que todavía no existen.
+
+create_all solo crea los índices de las tablas nuevas; en tablas ya creadas hay que
+añadirlos aparte. Es idempotente.
+
+Uso: python -m db.indices
+"""
+from sqlalchemy import inspect
+from models import Base
+
+def indices_faltantes(engine):
+    inspector = inspect(engine)
+    tablas = set(inspector.get_table_names())
+    faltantes = []
+    for tabla in Base.metadata.sorted_tables:
+        if tabla.name not in tablas:
+            continue
+        existentes = {i["name"] for i in inspector.get_indexes(tabla.name)}
+        faltantes.extend(i for i in tabla.indexes if i.name not in existentes)
+    return faltantes
+
+def crear_indices(engine):
+    creados = []
+    for indice in indices_faltantes(engine):
+        indice.create(bind=engine, checkfirst=True)
+        creados.append(indice.name)
+    return creados
+
+if __name__ == "__main__":
+    from db.db import engine
+    creados = crear_indices(engine)
+    for nombre in creados:
+        print(f"Índice creado: {nombre}")
+    print(f"{len(creados)} índices creados.")
@@ -1,4 +1,4 @@
-from db import Base, engine
-from models import User, Income, Expense, Saving, Investment, ExpenseGoal, SavingGoal, InvestmentGoal
+from db import engine
+from db.migraciones import aplicar_migraciones
 
-Base.metadata.create_all(bind=engine)
+aplicar_migraciones(engine)
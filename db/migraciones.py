@@ -0,0 +1,143 @@
+"""
+Migraciones versionadas del esquema.
+
+Cada migración es una función que recibe una conexión dentro de una transacción; al
+terminar se registra su versión en schema_version. El arranque de la app solo compara
+la versión guardada con la última conocida (una consulta, sin reflexión del esquema).
+
+Uso: python -m db.migraciones [actualizar | estado]
+"""
+import argparse
+import os
+from datetime import datetime
+from sqlalchemy import MetaData, Table, Column, Integer, String, DateTime, select, func, insert, inspect, text
+from sqlalchemy.exc import OperationalError, ProgrammingError
+from sqlalchemy.orm import Session
+from models import Base
+
+# Con false (recomendado con varios workers) la app no arranca si faltan migraciones
+MIGRACIONES_AL_ARRANCAR = os.getenv("MIGRACIONES_AL_ARRANCAR", "false").lower() in ("1", "true", "si", "yes")
+
+_metadata = MetaData()
+schema_version = Table(
+    "schema_version", _metadata,
+    Column("version", Integer, primary_key=True),
+    Column("descripcion", String, nullable=False),
+    Column("aplicada", DateTime, nullable=False, default=datetime.utcnow),
+)
+
+MIGRACIONES = []
+
+def migracion(version: int, descripcion: str):
+    def registrar(fn):
+        MIGRACIONES.append((version, descripcion, fn))
+        return fn
+    return registrar
+
+def crear_tablas(conn, *nombres):
+    for nombre in nombres:
+        Base.metadata.tables[nombre].create(bind=conn, checkfirst=True)
+
+# Las migraciones son idempotentes para poder aplicarse sobre bases creadas con
+# create_all antes de que existiera schema_version.
+
+@migracion(1, "Esquema inicial")
+def _esquema_inicial(conn):
+    crear_tablas(
+        conn, "users", "income", "expenses", "savings", "investments",
+        "expense_goals", "saving_goals", "investment_goals",
+    )
+
+@migracion(2, "Índices (user_id, date) en las tablas financieras")
+def _indices_usuario_fecha(conn):
+    from db.indices import crear_indices
+    crear_indices(conn)
+
+@migracion(3, "Tabla monthly_rollups y carga inicial")
+def _rollup_mensual(conn):
+    from models import MonthlyRollup
+    from services.rollup import reconstruir
+    crear_tablas(conn, "monthly_rollups")
+    db = Session(bind=conn)
+    if db.execute(select(func.count()).select_from(MonthlyRollup)).scalar() == 0:
+        # Sin marcar: users.data_version no existe hasta la migración 5
+        reconstruir(db, marcar=False)
+    db.close()
+
+@migracion(4, "Tabla import_jobs")
+def _trabajos_importacion(conn):
+    crear_tablas(conn, "import_jobs")
+
+@migracion(5, "Columna users.data_version")
+def _version_datos_usuario(conn):
+    if "data_version" not in {c["name"] for c in inspect(conn).get_columns("users")}:
+        conn.execute(text("ALTER TABLE users ADD COLUMN data_version INTEGER NOT NULL DEFAULT 0"))
+
+@migracion(6, "Columnas import_jobs.propietario y latido")
+def _propietario_trabajos(conn):
+    columnas = {c["name"] for c in inspect(conn).get_columns("import_jobs")}
+    if "propietario" not in columnas:
+        conn.execute(text("ALTER TABLE import_jobs ADD COLUMN propietario VARCHAR"))
+    if "latido" not in columnas:
+        tipo = DateTime().compile(dialect=conn.dialect)
+        conn.execute(text(f"ALTER TABLE import_jobs ADD COLUMN latido {tipo}"))
+
+def ultima_version() -> int:
+    return max(version for version, _, _ in MIGRACIONES)
+
+def version_actual(conn) -> int:
+    try:
+        return conn.execute(select(func.max(schema_version.c.version))).scalar() or 0
+    except (OperationalError, ProgrammingError):
+        # Base sin schema_version: nada aplicado todavía
+        conn.rollback()
+        return 0
+
+def pendientes(engine):
+    with engine.connect() as conn:
+        actual = version_actual(conn)
+    return [m for m in sorted(MIGRACIONES) if m[0] > actual]
+
+def aplicar_migraciones(engine):
+    """Aplica en orden las migraciones pendientes, cada una en su transacción."""
+    schema_version.create(bind=engine, checkfirst=True)
+    aplicadas = []
+    for version, descripcion, fn in pendientes(engine):
+        with engine.begin() as conn:
+            fn(conn)
+            conn.execute(insert(schema_version).values(version=version, descripcion=descripcion))
+        aplicadas.append((version, descripcion))
+    return aplicadas
+
+def comprobar_esquema(engine):
+    """Comprobación de arranque: falla si la base no está en la última versión."""
+    with engine.connect() as conn:
+        actual = version_actual(conn)
+    if actual >= ultima_version():
+        return actual
+    if MIGRACIONES_AL_ARRANCAR:
+        aplicar_migraciones(engine)
+        return ultima_version()
+    raise RuntimeError(
+        f"El esquema está en la versión {actual} y la aplicación necesita la {ultima_version()}. "
+        "Ejecute: python -m db.migraciones actualizar"
+    )
+
+if __name__ == "__main__":
+    from db.db import engine
+
+    parser = argparse.ArgumentParser(description="Migraciones del esquema de la base de datos")
+    parser.add_argument("accion", choices=["actualizar", "estado"], nargs="?", default="actualizar")
+    args = parser.parse_args()
+
+    if args.accion == "actualizar":
+        aplicadas = aplicar_migraciones(engine)
+        for version, descripcion in aplicadas:
+            print(f"Aplicada {version}: {descripcion}")
+        print(f"Esquema en la versión {ultima_version()} ({len(aplicadas)} migraciones aplicadas).")
+    else:
+        with engine.connect() as conn:
+            actual = version_actual(conn)
+        print(f"Versión actual: {actual}. Última versión: {ultima_version()}.")
+        for version, descripcion, _ in sorted(MIGRACIONES):
+            print(f"  [{'x' if version <= actual else ' '}] {version}: {descripcion}")
@@ -0,0 +1,87 @@
+import os
+import threading
+import time
+from sqlalchemy import exc
+from sqlalchemy.pool import QueuePool, AsyncAdaptedQueuePool
+
+# Configuración del pool de conexiones (ignorada en SQLite en memoria)
+POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "si", "yes")
+
+class PoolMedido:
+    """Mezcla para los QueuePool de SQLAlchemy que mide la espera de cada checkout."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._lock_medicion = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.espera_total = 0.0
+        self.espera_max = 0.0
+
+    def _do_get(self):
+        inicio = time.perf_counter()
+        try:
+            conexion = super()._do_get()
+        except exc.TimeoutError:
+            with self._lock_medicion:
+                self.timeouts += 1
+            raise
+        espera = time.perf_counter() - inicio
+        with self._lock_medicion:
+            self.checkouts += 1
+            self.espera_total += espera
+            self.espera_max = max(self.espera_max, espera)
+        return conexion
+
+    def estadisticas(self):
+        with self._lock_medicion:
+            return {
+                "tamano": self.size(),
+                "max_overflow": self._max_overflow,
+                "timeout_segundos": self._timeout,
+                "en_uso": self.checkedout(),
+                "libres": self.checkedin(),
+                "overflow": max(self.overflow(), 0),
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "espera_promedio_ms": 1000 * self.espera_total / self.checkouts if self.checkouts else 0.0,
+                "espera_max_ms": 1000 * self.espera_max,
+            }
+
+class QueuePoolMedido(PoolMedido, QueuePool):
+    pass
+
+class AsyncQueuePoolMedido(PoolMedido, AsyncAdaptedQueuePool):
+    pass
+
+def es_sqlite(url: str) -> bool:
+    return url.startswith("sqlite")
+
+def opciones_engine(url: str, asincrono: bool = False) -> dict:
+    """Argumentos de create_engine / create_async_engine según el backend de la URL."""
+    if es_sqlite(url):
+        # SQLite: las sesiones se usan desde varios hilos del threadpool
+        opciones = {"connect_args": {"check_same_thread": False}}
+        if ":memory:" in url or url.rstrip("/").endswith(":"):
+            # En memoria cada conexión es una base distinta: se deja el pool por defecto
+            return opciones
+    else:
+        # Servidores: descartar conexiones cortadas o que superen el timeout del servidor
+        opciones = {"pool_pre_ping": POOL_PRE_PING, "pool_recycle": POOL_RECYCLE}
+    opciones.update(
+        poolclass=AsyncQueuePoolMedido if asincrono else QueuePoolMedido,
+        pool_size=POOL_SIZE,
+        max_overflow=MAX_OVERFLOW,
+        pool_timeout=POOL_TIMEOUT,
+    )
+    return opciones
+
+def estadisticas_pool(engine):
+    pool = engine.pool
+    if isinstance(pool, PoolMedido):
+        return pool.estadisticas()
+    return {"estado": pool.status()}
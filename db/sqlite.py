@@ -0,0 +1,40 @@
+import os
+from sqlalchemy import event
+
+# Perfil de rendimiento para SQLite (opcional): SQLITE_PERFIL=rendimiento
+SQLITE_PERFIL = os.getenv("SQLITE_PERFIL", "")
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+SQLITE_CACHE_SIZE = int(os.getenv("SQLITE_CACHE_SIZE", "-65536"))  # negativo = KiB
+SQLITE_BUSY_TIMEOUT = int(os.getenv("SQLITE_BUSY_TIMEOUT", "5000"))  # ms
+
+def pragmas_rendimiento():
+    # WAL: los lectores no se bloquean con el escritor. synchronous=NORMAL en WAL
+    # solo hace fsync en los checkpoints y sigue siendo consistente ante caídas
+    # (puede perderse la última transacción si se cae el sistema operativo).
+    return [
+        ("journal_mode", "WAL"),
+        ("synchronous", "NORMAL"),
+        ("mmap_size", SQLITE_MMAP_SIZE),
+        ("cache_size", SQLITE_CACHE_SIZE),
+        ("temp_store", "MEMORY"),
+        ("busy_timeout", SQLITE_BUSY_TIMEOUT),
+    ]
+
+PERFILES = {
+    "rendimiento": pragmas_rendimiento,
+}
+
+def configurar_sqlite(engine, perfil: str = SQLITE_PERFIL):
+    """Aplica los PRAGMA del perfil a cada conexión nueva del engine (sync o async.sync_engine)."""
+    if engine.dialect.name != "sqlite" or not perfil:
+        return
+    if perfil not in PERFILES:
+        raise ValueError(f"Perfil SQLite '{perfil}' no soportado. Opciones válidas: {', '.join(PERFILES)}")
+    pragmas = PERFILES[perfil]()
+
+    @event.listens_for(engine, "connect")
+    def aplicar_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for nombre, valor in pragmas:
+            cursor.execute(f"PRAGMA {nombre}={valor}")
+        cursor.close()
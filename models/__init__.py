@@ -12,3 +12,5 @@ from .investment import Investment
 from .expense_goal import ExpenseGoal
 from .saving_goal import SavingGoal
 from .investment_goal import InvestmentGoal
+from .monthly_rollup import MonthlyRollup
+from .import_job import ImportJob
@@ -7,6 +7,7 @@ from sqlalchemy import (
     Date,
     ForeignKey,
     PrimaryKeyConstraint,
+    Index,
 )
 from sqlalchemy.orm import relationship, declarative_base
 from . import Base
@@ -14,6 +15,8 @@ class Expense(Base):
     __tablename__ = 'expenses'
     __table_args__ = (
         PrimaryKeyConstraint('date', 'user_id'),
+        # Consultas por usuario y rango de fechas; incluye las columnas leídas
+        Index('ix_expenses_user_id_date', 'user_id', 'date', 'amount', 'category'),
     )
 
     date = Column(Date, nullable=False)
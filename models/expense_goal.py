@@ -7,6 +7,7 @@ from sqlalchemy import (
     Date,
     ForeignKey,
     PrimaryKeyConstraint,
+    Index,
 )
 from sqlalchemy.orm import relationship, declarative_base
 from . import Base
@@ -14,6 +15,8 @@ class ExpenseGoal(Base):
     __tablename__ = 'expense_goals'
     __table_args__ = (
         PrimaryKeyConstraint('date', 'user_id'),
+        # Consultas por usuario y rango de fechas; incluye las columnas leídas
+        Index('ix_expense_goals_user_id_date', 'user_id', 'date', 'value'),
     )
 
     date = Column(Date, nullable=False)
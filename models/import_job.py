@@ -0,0 +1,27 @@
+from datetime import datetime
+from sqlalchemy import (
+    Column,
+    Integer,
+    String,
+    Text,
+    DateTime,
+    ForeignKey,
+)
+from . import Base
+class ImportJob(Base):
+    __tablename__ = 'import_jobs'
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    user_id = Column(Integer, ForeignKey('users.id'), nullable=False)
+    tipo = Column(String, nullable=False)
+    conflicto = Column(String, nullable=False, default="error")
+    estado = Column(String, nullable=False, default="pendiente")  # pendiente, procesando, completado, error
+    filas_leidas = Column(Integer, nullable=False, default=0)
+    filas_importadas = Column(Integer, nullable=False, default=0)
+    filas_rechazadas = Column(Integer, nullable=False, default=0)
+    errores = Column(Text, nullable=True)  # lista JSON de errores por línea
+    # Proceso que ejecuta el trabajo ("host:pid:arranque") y su último latido
+    propietario = Column(String, nullable=True)
+    latido = Column(DateTime, nullable=True)
+    creado = Column(DateTime, nullable=False, default=datetime.utcnow)
+    actualizado = Column(DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
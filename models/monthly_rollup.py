@@ -0,0 +1,19 @@
+from sqlalchemy import (
+    Column,
+    Integer,
+    String,
+    Float,
+    ForeignKey,
+    PrimaryKeyConstraint,
+)
+from . import Base
+class MonthlyRollup(Base):
+    __tablename__ = 'monthly_rollups'
+    __table_args__ = (
+        PrimaryKeyConstraint('user_id', 'kind', 'period'),
+    )
+
+    user_id = Column(Integer, ForeignKey('users.id'), nullable=False)
+    kind = Column(String, nullable=False)     # income, expense, saving, investment o *_goal
+    period = Column(Integer, nullable=False)  # YYYYMM
+    total = Column(Float, nullable=False)     # suma del mes (o última meta del mes)
@@ -17,6 +17,8 @@ class User(Base):
     email = Column(String, unique=True, nullable=False)
     username = Column(String, unique=True, nullable=False)
     password = Column(String, nullable=False)
+    # Se incrementa en cada commit que cambia sus datos; base de los ETag de lectura
+    data_version = Column(Integer, nullable=False, default=0, server_default="0")
 
     incomes = relationship("Income", back_populates="user", cascade="all, delete-orphan")
     expenses = relationship("Expense", back_populates="user", cascade="all, delete-orphan")
@@ -1,17 +1,23 @@
 from fastapi import APIRouter
 from .importacion import router as importacion_router
+from .exportacion import router as exportacion_router
 from .expenses import router as expenses_router
 from .savings import router as savings_router
 from .investments import router as investments_router
 from .income import router as income_router
+from .lote import router as lote_router
 from routes.finance_history import router as finance_history_router
+from .metricas import router as metricas_router
 
 router = APIRouter()
 router.include_router(importacion_router, prefix="/api/importacion", tags=["importacion"])
+router.include_router(exportacion_router, prefix="/api/exportacion", tags=["exportacion"])
 router.include_router(expenses_router)
 router.include_router(savings_router)
 router.include_router(investments_router)
+router.include_router(lote_router)
 router.include_router(income_router, prefix="/api/incomes", tags=["incomes"])
 router.include_router(finance_history_router)
+router.include_router(metricas_router)
 
 __all__ = ['router']
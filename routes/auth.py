@@ -1,20 +1,22 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, BackgroundTasks
 from sqlalchemy.orm import Session
-from passlib.context import CryptContext
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel, EmailStr, conint
 from datetime import date
 from jose import jwt, JWTError
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from db.db import get_db
+from db.db import get_db, SessionLocal
 from models.user import User
 from models.expense_goal import ExpenseGoal
 from models.saving_goal import SavingGoal
 from models.investment_goal import InvestmentGoal
+from services.rollup import refrescar
+from services.cache_usuarios import cache_usuarios, UsuarioCacheado
+from services.contrasenas import hash_password, verify_password, necesita_rehash, EjecutorSaturado
 import re
 
 SECRET_KEY = "dinamifin-secret"
 ALGORITHM = "HS256"
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 security = HTTPBearer()
 
 router = APIRouter()
@@ -45,15 +47,13 @@ class LoginRequest(BaseModel):
     email: EmailStr
     password: str
 
-@router.post("/register")
-def register(data: RegisterRequest, db: Session = Depends(get_db)):
-    if data.meta_gasto + data.meta_ahorro + data.meta_inversion > 100:
-        raise HTTPException(status_code=400, detail="La suma de metas no puede superar el 100%")
-
-    if db.query(User).filter(User.email == data.email).first():
-        raise HTTPException(status_code=400, detail="El correo ya está registrado")
+async def hash_o_503(fn, *args):
+    try:
+        return await fn(*args)
+    except EjecutorSaturado:
+        raise HTTPException(status_code=503, detail="Servicio ocupado, intente de nuevo en unos segundos")
 
-    hashed_password = pwd_context.hash(data.password)
+def crear_usuario(db: Session, data: RegisterRequest, hashed_password: str):
     user = User(email=data.email, username=data.username or data.email, password=hashed_password)
     db.add(user)
     db.commit()
@@ -66,39 +66,58 @@ def register(data: RegisterRequest, db: Session = Depends(get_db)):
         db.add(SavingGoal(user_id=user.id, value=data.meta_ahorro, date=today))
     if data.meta_inversion:
         db.add(InvestmentGoal(user_id=user.id, value=data.meta_inversion, date=today))
+    for tipo in ("expense_goal", "saving_goal", "investment_goal"):
+        refrescar(db, user.id, tipo, [today])
     db.commit()
 
+def buscar_por_email(db: Session, email: str):
+    return db.query(User).filter(User.email == email).first()
+
+# Las operaciones de base de datos van al threadpool y bcrypt a su pool dedicado
+@router.post("/register")
+async def register(data: RegisterRequest, db: Session = Depends(get_db)):
+    if data.meta_gasto + data.meta_ahorro + data.meta_inversion > 100:
+        raise HTTPException(status_code=400, detail="La suma de metas no puede superar el 100%")
+
+    if await run_in_threadpool(buscar_por_email, db, data.email):
+        raise HTTPException(status_code=400, detail="El correo ya está registrado")
+
+    hashed_password = await hash_o_503(hash_password, data.password)
+    await run_in_threadpool(crear_usuario, db, data, hashed_password)
+
     return {"message": "Usuario registrado exitosamente"}
 
+def guardar_rehash(user_id: int, hash_anterior: str, hash_nuevo: str):
+    db = SessionLocal()
+    try:
+        # Solo si la contraseña no cambió mientras tanto
+        db.query(User).filter(User.id == user_id, User.password == hash_anterior)\
+            .update({User.password: hash_nuevo}, synchronize_session=False)
+        db.commit()
+    finally:
+        db.close()
+
+async def rehash_en_segundo_plano(user_id: int, password: str, hash_anterior: str):
+    try:
+        hash_nuevo = await hash_password(password)
+    except EjecutorSaturado:
+        return  # se reintentará en el próximo inicio de sesión
+    await run_in_threadpool(guardar_rehash, user_id, hash_anterior, hash_nuevo)
+
 @router.post("/login")
-def login(data: LoginRequest, db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.email == data.email).first()
-    if not user or not pwd_context.verify(data.password, user.password):
+async def login(data: LoginRequest, background_tasks: BackgroundTasks, db: Session = Depends(get_db)):
+    user = await run_in_threadpool(buscar_por_email, db, data.email)
+    if not user or not await hash_o_503(verify_password, data.password, user.password):
         raise HTTPException(status_code=401, detail="Credenciales inválidas")
 
+    # Hash fuera de la política actual (esquema o coste): se rehace tras responder
+    if necesita_rehash(user.password):
+        background_tasks.add_task(rehash_en_segundo_plano, user.id, data.password, user.password)
+
     token_data = {"sub": str(user.id), "user_id": user.id, "username": user.username, "email": user.email}
     token = jwt.encode(token_data, SECRET_KEY, algorithm=ALGORITHM)
     return {"access_token": token, "token_type": "bearer"}
 
-@router.get("/dashboard")
-def get_dashboard(credentials: HTTPAuthorizationCredentials = Depends(security), db: Session = Depends(get_db)):
-    try:
-        payload = jwt.decode(credentials.credentials, SECRET_KEY, algorithms=[ALGORITHM])
-        user_id = payload.get("user_id")
-        if user_id is None:
-            raise HTTPException(status_code=401, detail="Token inválido")
-    except JWTError:
-        raise HTTPException(status_code=401, detail="Token inválido")
-
-    user = db.query(User).filter(User.id == user_id).first()
-    if not user:
-        raise HTTPException(status_code=404, detail="Usuario no encontrado")
-
-    return {
-        "id": user.id,
-        "email": user.email,
-        "username": user.username
-    }
 def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
     db: Session = Depends(get_db)
@@ -111,12 +130,21 @@ def get_current_user(
     except JWTError:
         raise HTTPException(status_code=401, detail="Token inválido")
 
+    # Identidad en caché: solo se consulta la base si no está o expiró
+    cacheado = cache_usuarios.obtener(user_id)
+    if cacheado:
+        return cacheado
+
     user = db.query(User).filter(User.id == user_id).first()
     if not user:
         raise HTTPException(status_code=404, detail="Usuario no encontrado")
 
-    return user
-
-def get_password_hash(password: str) -> str:
-    return pwd_context.hash(password)
+    return cache_usuarios.guardar(user)
 
+@router.get("/dashboard")
+def get_dashboard(current_user: UsuarioCacheado = Depends(get_current_user)):
+    return {
+        "id": current_user.id,
+        "email": current_user.email,
+        "username": current_user.username
+    }
@@ -1,12 +1,19 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Query, Request, Response
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select
 from typing import List, Optional
 from datetime import date
 from pydantic import BaseModel, Field, validator
 from enum import Enum
 
-from db.db import get_db
+from db.db import get_db, get_async_db
 from models.expense import Expense
+from services.rollup import refrescar
+from services.repositorio import crear_registro, RegistroExistente
+from services.versiones import version_datos, etag, no_modificado
+from services.respuestas import RESPUESTAS_RAPIDAS, RespuestaRapida, filas_a_dicts
+from services.paginacion import listar_pagina, PAGINA_DEFECTO, PAGINA_MAX, CABECERA_CURSOR
 
 router = APIRouter(
     prefix="/datos/gastos",
@@ -41,12 +48,37 @@ class ExpenseUpdate(BaseModel):
     amount: Optional[float] = Field(None, gt=0, description="El monto debe ser mayor que 0")
     category: Optional[ExpenseCategory] = None
 
+# Columnas de cada elemento del listado
+COLUMNAS = ["date", "amount", "category"]
+
 @router.get("/{user_id}", response_model=List[dict])
-def get_expenses(user_id: int, db: Session = Depends(get_db)):
+async def get_expenses(
+    user_id: int,
+    request: Request,
+    response: Response,
+    limit: int = Query(PAGINA_DEFECTO, ge=1, le=PAGINA_MAX),
+    cursor: Optional[date] = Query(None, description="Valor de la cabecera X-Next-Cursor de la página anterior"),
+    desde: Optional[date] = None,
+    hasta: Optional[date] = None,
+    category: Optional[ExpenseCategory] = None,
+    db: AsyncSession = Depends(get_async_db)
+):
     try:
-        expenses = db.query(Expense).filter(
-            Expense.user_id == user_id
-        ).all()
+        valor_etag = etag(await version_datos(db, user_id))
+        if no_modificado(request.headers.get("if-none-match"), valor_etag):
+            return Response(status_code=304, headers={"ETag": valor_etag})
+        response.headers["ETag"] = valor_etag
+
+        filtros = (cursor, desde, hasta, category.value if category else None)
+        if RESPUESTAS_RAPIDAS:
+            filas, siguiente = await listar_pagina(db, Expense, user_id, limit, *filtros, columnas=COLUMNAS)
+            if siguiente:
+                response.headers[CABECERA_CURSOR] = siguiente
+            return RespuestaRapida(filas_a_dicts(COLUMNAS, filas), headers=dict(response.headers))
+
+        expenses, siguiente = await listar_pagina(db, Expense, user_id, limit, *filtros)
+        if siguiente:
+            response.headers[CABECERA_CURSOR] = siguiente
         return [
             {
                 "date": expense.date,
@@ -59,12 +91,14 @@ def get_expenses(user_id: int, db: Session = Depends(get_db)):
         raise HTTPException(status_code=400, detail=str(e))
 
 @router.get("/{user_id}/{date}", response_model=dict)
-def get_expense_by_date(user_id: int, date: date, db: Session = Depends(get_db)):
+async def get_expense_by_date(user_id: int, date: date, db: AsyncSession = Depends(get_async_db)):
     try:
-        expense = db.query(Expense).filter(
-            Expense.user_id == user_id,
-            Expense.date == date
-        ).first()
+        expense = (await db.execute(
+            select(Expense).where(
+                Expense.user_id == user_id,
+                Expense.date == date
+            )
+        )).scalars().first()
         
         if not expense:
             raise HTTPException(status_code=404, detail="Gasto no encontrado")
@@ -78,29 +112,29 @@ def get_expense_by_date(user_id: int, date: date, db: Session = Depends(get_db))
         raise HTTPException(status_code=400, detail=str(e))
 
 @router.post("/{user_id}")
-def create_expense(user_id: int, expense: ExpenseCreate, db: Session = Depends(get_db)):
+def create_expense(
+    user_id: int,
+    expense: ExpenseCreate,
+    upsert: bool = Query(False, description="Si ya hay un registro en esa fecha, lo reemplaza"),
+    db: Session = Depends(get_db)
+):
     try:
-        existing_expense = db.query(Expense).filter(
-            Expense.user_id == user_id,
-            Expense.date == expense.expense_date
-        ).first()
-        
-        if existing_expense:
+        try:
+            data = crear_registro(db, Expense, {
+                "user_id": user_id,
+                "date": expense.expense_date,
+                "amount": expense.amount,
+                "category": expense.category.value,
+            }, "sobrescribir" if upsert else "error")
+        except RegistroExistente:
             raise HTTPException(
                 status_code=400,
                 detail="Ya existe un gasto registrado para esta fecha. Use el endpoint PUT para actualizarlo."
             )
 
-        new_expense = Expense(
-            user_id=user_id,
-            amount=expense.amount,
-            category=expense.category,
-            date=expense.expense_date
-        )
-        db.add(new_expense)
+        refrescar(db, user_id, "expense", [expense.expense_date])
         db.commit()
-        db.refresh(new_expense)
-        return {"message": "Gasto creado exitosamente", "data": new_expense}
+        return {"message": "Gasto creado exitosamente", "data": data}
     except Exception as e:
         db.rollback()
         raise HTTPException(status_code=400, detail=str(e))
@@ -120,7 +154,8 @@ def update_expense(user_id: int, date: date, expense: ExpenseUpdate, db: Session
             expense_db.amount = expense.amount
         if expense.category is not None:
             expense_db.category = expense.category
-            
+
+        refrescar(db, user_id, "expense", [date])
         db.commit()
         return {"message": "Gasto actualizado exitosamente", "data": expense_db}
     except Exception as e:
@@ -139,6 +174,7 @@ def delete_expense(user_id: int, date: date, db: Session = Depends(get_db)):
             raise HTTPException(status_code=404, detail="Gasto no encontrado")
         
         db.delete(expense)
+        refrescar(db, user_id, "expense", [date])
         db.commit()
         return {"message": "Gasto eliminado exitosamente"}
     except Exception as e:
@@ -0,0 +1,40 @@
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from typing import List, Optional
+from services.exportacion import TIPOS_EXPORTACION, generar_ndjson, generar_csv
+
+router = APIRouter()
+
+def validar_tipos(tipos: List[str]):
+    invalidos = [t for t in tipos if t not in TIPOS_EXPORTACION]
+    if invalidos:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Tipo '{invalidos[0]}' no soportado. Tipos válidos: {', '.join(TIPOS_EXPORTACION.keys())}"
+        )
+
+# Historial completo en streaming: la memoria no depende de la cantidad de registros.
+# NDJSON incluye todos los tipos (o los pedidos); CSV es de un solo tipo, con el formato de /importar.
+@router.get("/{user_id}")
+def exportar(
+    user_id: int,
+    formato: str = Query("ndjson", regex="^(ndjson|csv)$"),
+    tipo: Optional[List[str]] = Query(None),
+):
+    tipos = tipo or list(TIPOS_EXPORTACION.keys())
+    validar_tipos(tipos)
+
+    if formato == "csv":
+        if len(tipos) != 1:
+            raise HTTPException(status_code=400, detail="La exportación CSV requiere un único 'tipo'")
+        return StreamingResponse(
+            generar_csv(user_id, tipos[0]),
+            media_type="text/csv; charset=utf-8",
+            headers={"Content-Disposition": f'attachment; filename="{tipos[0]}.csv"'},
+        )
+
+    return StreamingResponse(
+        generar_ndjson(user_id, tipos),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": f'attachment; filename="historial_{user_id}.ndjson"'},
+    )
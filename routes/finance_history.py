@@ -1,10 +1,17 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
+import time
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select
 from datetime import date, timedelta
 from typing import List, Optional, Dict
-from db import get_db 
-from models import Income, Expense, Saving, Investment, ExpenseGoal, SavingGoal, InvestmentGoal
-from schemas import FinanceHistoryRecord, GoalHistoryRecord 
+from db import get_async_db
+from models import MonthlyRollup
+from schemas import FinanceHistoryRecord, GoalHistoryRecord, HistorySummary
+from services.rollup import periodo_de, totales_rango
+from services.cache_historial import cache_historial, clave_historial
+from services.versiones import version_datos, etag, no_modificado
+from services.respuestas import RESPUESTAS_RAPIDAS, a_json
+from pydantic import TypeAdapter
 
 router = APIRouter(
     prefix="/history",
@@ -26,120 +33,220 @@ def periodo_to_start_date(periodo: str):
         return hoy - timedelta(days=1825)
     return hoy.replace(day=1)
 
-def group_by_month(records, field="amount", start_date=None, end_date=None):
-    res = {}
+def formato_periodo(periodo: int) -> str:
+    return f"{periodo // 100}-{periodo % 100:02d}"
+
+def meses_entre(start_date, end_date):
+    # Calendario de periodos 'YYYY-MM' para rellenar meses sin registros
+    meses = []
     current = start_date.replace(day=1)
     while current <= end_date:
-        key = f"{current.year}-{current.month:02d}"
-        res[key] = 0
+        meses.append(f"{current.year}-{current.month:02d}")
         current += timedelta(days=32)
         current = current.replace(day=1)
-    for r in records:
-        key = f"{r.date.year}-{r.date.month:02d}"
-        if key in res:
-            res[key] += getattr(r, field)
-    return [{"period": k, "total": v} for k, v in sorted(res.items())]
+    return meses
+
+def ultimo_dia(fecha: date) -> date:
+    return (fecha.replace(day=1) + timedelta(days=32)).replace(day=1) - timedelta(days=1)
+
+async def leer_rollup(db: AsyncSession, user_id: int, tipos, start_date, end_date=None):
+    # Totales mensuales de las filas con start_date <= date (<= end_date): {tipo: {'YYYY-MM': total}}.
+    # Los meses completos salen del rollup; los de los extremos que el rango cubre solo en
+    # parte se calculan sobre las tablas base, acotados a sus días
+    inicio_completo = start_date.day == 1
+    fin_completo = end_date is None or end_date == ultimo_dia(end_date)
+    filtros = [
+        MonthlyRollup.user_id == user_id,
+        MonthlyRollup.kind.in_(tipos),
+        MonthlyRollup.period >= periodo_de(start_date) if inicio_completo
+        else MonthlyRollup.period > periodo_de(start_date),
+    ]
+    if end_date is not None:
+        filtros.append(MonthlyRollup.period <= periodo_de(end_date) if fin_completo
+                       else MonthlyRollup.period < periodo_de(end_date))
+    res = {tipo: {} for tipo in tipos}
+    filas = (await db.execute(
+        select(MonthlyRollup.kind, MonthlyRollup.period, MonthlyRollup.total).where(*filtros)
+    )).all()
+    for tipo, periodo, total in filas:
+        res[tipo][formato_periodo(periodo)] = total
+
+    tramos = []
+    if not inicio_completo:
+        fin_mes = ultimo_dia(start_date)
+        tramos.append((start_date, fin_mes if end_date is None else min(fin_mes, end_date)))
+    if not fin_completo:
+        inicio_mes = max(end_date.replace(day=1), start_date)
+        if not tramos or inicio_mes > tramos[0][1]:
+            tramos.append((inicio_mes, end_date))
+    if tramos:
+        for _, tipo, periodo, total in (await db.execute(totales_rango(user_id, tipos, tramos))).all():
+            res[tipo][formato_periodo(periodo)] = total
+    return res
+
+def serie_mensual(totales, start_date, end_date):
+    return [{"period": k, "total": float(totales.get(k, 0))} for k in meses_entre(start_date, end_date)]
+
+def serie_metas(real, metas, ingresos):
+    return [
+        {
+            "period": k,
+            "real": float(real.get(k, 0)),
+            "goal": float(metas.get(k, 0)),
+            "income": float(ingresos.get(k, 0)),
+        }
+        for k in sorted(real.keys() | metas.keys() | ingresos.keys())
+    ]
+
+# Ingresos y gastos solo cuentan hasta hoy; ahorro e inversión, el mes en curso completo
+SERIES_HASTA_HOY = {"income", "expense"}
+
+async def totales_por_mes(db: AsyncSession, tipo: str, user_id: int, start_date, end_date):
+    hasta = end_date if tipo in SERIES_HASTA_HOY else None
+    totales = (await leer_rollup(db, user_id, [tipo], start_date, hasta))[tipo]
+    return serie_mensual(totales, start_date, end_date)
+
+async def metas_por_mes(db: AsyncSession, tipo: str, user_id: int, start_date):
+    res = await leer_rollup(db, user_id, [tipo, f"{tipo}_goal", "income"], start_date)
+    return serie_metas(res[tipo], res[f"{tipo}_goal"], res["income"])
+
+# Respuestas validadas y serializadas una sola vez; los aciertos de caché no tocan la base
+SERIE_MENSUAL = TypeAdapter(List[FinanceHistoryRecord])
+SERIE_METAS = TypeAdapter(List[GoalHistoryRecord])
+RESUMEN = TypeAdapter(HistorySummary)
+
+async def cacheado(request: Request, db: AsyncSession, endpoint: str, user_id: int, periodo: str,
+                   adaptador: TypeAdapter, calcular):
+    # La serie depende de los datos del usuario y del día (la ventana se desplaza)
+    hoy = date.today().isoformat()
+    clave = clave_historial(endpoint, user_id, periodo, hoy)
+    si_no_coincide = request.headers.get("if-none-match")
+    entrada = cache_historial.obtener(clave)
+    if entrada is None:
+        inicio = time.monotonic()
+        # Versión leída antes que los datos: el ETag nunca describe datos más viejos
+        valor_etag = etag(await version_datos(db, user_id), hoy)
+        if no_modificado(si_no_coincide, valor_etag):
+            return Response(status_code=304, headers={"ETag": valor_etag})
+        datos = await calcular()
+        if RESPUESTAS_RAPIDAS:
+            # Series construidas aquí mismo con la forma del esquema: no hace falta validarlas
+            contenido = a_json(datos)
+        else:
+            contenido = adaptador.dump_json(adaptador.validate_python(datos))
+        cache_historial.guardar(user_id, clave, valor_etag, contenido, calculado_desde=inicio)
+    else:
+        valor_etag, contenido = entrada
+        if no_modificado(si_no_coincide, valor_etag):
+            return Response(status_code=304, headers={"ETag": valor_etag})
+    return Response(content=contenido, media_type="application/json", headers={"ETag": valor_etag})
 
 # HISTÓRICO GENERAL
 @router.get("/income/{user_id}", response_model=List[FinanceHistoryRecord])
-def get_income_history(
+async def get_income_history(
     user_id: int,
+    request: Request,
     periodo: str = Query("1y", regex="^(1m|6m|1y|3y|5y)$"),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     start = periodo_to_start_date(periodo)
     end = date.today()  # Fecha final es hoy
-    res = db.query(Income).filter(
-        Income.user_id == user_id, 
-        Income.date >= start,
-        Income.date <= end  # Filtra hasta hoy
-    ).all()
-    return group_by_month(res, "amount", start, end)  # Pasa fechas
+    return await cacheado(request, db, "income", user_id, periodo, SERIE_MENSUAL,
+                          lambda: totales_por_mes(db, "income", user_id, start, end))
 
 @router.get("/expense/{user_id}", response_model=List[FinanceHistoryRecord])
-def get_expense_history(
+async def get_expense_history(
     user_id: int,
+    request: Request,
     periodo: str = Query("1y", regex="^(1m|6m|1y|3y|5y)$"),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     start = periodo_to_start_date(periodo)
     end = date.today()
-    res = db.query(Expense).filter(Expense.user_id == user_id, Expense.date >= start, Expense.date <= end).all()
-    return group_by_month(res, "amount", start, end)
+    return await cacheado(request, db, "expense", user_id, periodo, SERIE_MENSUAL,
+                          lambda: totales_por_mes(db, "expense", user_id, start, end))
 
 @router.get("/saving/{user_id}", response_model=List[FinanceHistoryRecord])
-def get_saving_history(
+async def get_saving_history(
     user_id: int,
+    request: Request,
     periodo: str = Query("1y", regex="^(1m|6m|1y|3y|5y)$"),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     start = periodo_to_start_date(periodo)
     end = date.today() 
-    res = db.query(Saving).filter(Saving.user_id == user_id, Saving.date >= start).all()
-    return group_by_month(res, "amount", start, end)
+    return await cacheado(request, db, "saving", user_id, periodo, SERIE_MENSUAL,
+                          lambda: totales_por_mes(db, "saving", user_id, start, end))
 
 @router.get("/investment/{user_id}", response_model=List[FinanceHistoryRecord])
-def get_investment_history(
+async def get_investment_history(
     user_id: int,
+    request: Request,
     periodo: str = Query("1y", regex="^(1m|6m|1y|3y|5y)$"),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     start = periodo_to_start_date(periodo)
     end = date.today() 
-    res = db.query(Investment).filter(Investment.user_id == user_id, Investment.date >= start).all()
-    return group_by_month(res, "amount", start, end)
-
-def group_goal_by_month(real, goal, incomes):
-    out = {}
-    for r in real:
-        key = f"{r.date.year}-{r.date.month:02d}"
-        out.setdefault(key, {"real": 0, "goal": 0, "income": 0})
-        out[key]["real"] += getattr(r, "amount", getattr(r, "value", 0))
-    for g in goal:
-        key = f"{g.date.year}-{g.date.month:02d}"
-        out.setdefault(key, {"real": 0, "goal": 0, "income": 0})
-        out[key]["goal"] = getattr(g, "value", getattr(g, "amount", 0))
-    for i in incomes:
-        key = f"{i.date.year}-{i.date.month:02d}"
-        out.setdefault(key, {"real": 0, "goal": 0, "income": 0})
-        out[key]["income"] += getattr(i, "amount", getattr(i, "value", 0))
-    return [
-        {"period": k, "real": v["real"], "goal": v["goal"], "income": v["income"]}
-        for k, v in sorted(out.items())
-    ]
+    return await cacheado(request, db, "investment", user_id, periodo, SERIE_MENSUAL,
+                          lambda: totales_por_mes(db, "investment", user_id, start, end))
 
 @router.get("/expense_goal/{user_id}", response_model=List[GoalHistoryRecord])
-def get_expense_goal_history(
+async def get_expense_goal_history(
     user_id: int,
+    request: Request,
     periodo: str = Query("1y", regex="^(1m|6m|1y|3y|5y)$"),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     start = periodo_to_start_date(periodo)
-    real = db.query(Expense).filter(Expense.user_id == user_id, Expense.date >= start).all()
-    goals = db.query(ExpenseGoal).filter(ExpenseGoal.user_id == user_id, ExpenseGoal.date >= start).all()
-    incomes = db.query(Income).filter(Income.user_id == user_id, Income.date >= start).all()
-    return group_goal_by_month(real, goals, incomes)
+    return await cacheado(request, db, "expense_goal", user_id, periodo, SERIE_METAS,
+                          lambda: metas_por_mes(db, "expense", user_id, start))
 
 @router.get("/saving_goal/{user_id}", response_model=List[GoalHistoryRecord])
-def get_saving_goal_history(
+async def get_saving_goal_history(
     user_id: int,
+    request: Request,
     periodo: str = Query("1y", regex="^(1m|6m|1y|3y|5y)$"),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     start = periodo_to_start_date(periodo)
-    real = db.query(Saving).filter(Saving.user_id == user_id, Saving.date >= start).all()
-    goals = db.query(SavingGoal).filter(SavingGoal.user_id == user_id, SavingGoal.date >= start).all()
-    incomes = db.query(Income).filter(Income.user_id == user_id, Income.date >= start).all()
-    return group_goal_by_month(real, goals, incomes)
+    return await cacheado(request, db, "saving_goal", user_id, periodo, SERIE_METAS,
+                          lambda: metas_por_mes(db, "saving", user_id, start))
 
 @router.get("/investment_goal/{user_id}", response_model=List[GoalHistoryRecord])
-def get_investment_goal_history(
+async def get_investment_goal_history(
+    user_id: int,
+    request: Request,
+    periodo: str = Query("1y", regex="^(1m|6m|1y|3y|5y)$"),
+    db: AsyncSession = Depends(get_async_db),
+):
+    start = periodo_to_start_date(periodo)
+    return await cacheado(request, db, "investment_goal", user_id, periodo, SERIE_METAS,
+                          lambda: metas_por_mes(db, "investment", user_id, start))
+
+# RESUMEN: todas las series del dashboard en una sola petición
+SERIES_RESUMEN = ["income", "expense", "saving", "investment"]
+
+@router.get("/summary/{user_id}", response_model=HistorySummary)
+async def get_history_summary(
     user_id: int,
+    request: Request,
     periodo: str = Query("1y", regex="^(1m|6m|1y|3y|5y)$"),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     start = periodo_to_start_date(periodo)
-    real = db.query(Investment).filter(Investment.user_id == user_id, Investment.date >= start).all()
-    goals = db.query(InvestmentGoal).filter(InvestmentGoal.user_id == user_id, InvestmentGoal.date >= start).all()
-    incomes = db.query(Income).filter(Income.user_id == user_id, Income.date >= start).all()
-    return group_goal_by_month(real, goals, incomes)
+    end = date.today()
+    metas = [f"{tipo}_goal" for tipo in SERIES_RESUMEN if tipo != "income"]
+
+    async def calcular():
+        res = await leer_rollup(db, user_id, SERIES_RESUMEN + metas, start)
+        # Las series de metas usan los ingresos sin acotar, como en sus endpoints
+        hasta_hoy = await leer_rollup(db, user_id, sorted(SERIES_HASTA_HOY), start, end)
+        resumen = {
+            tipo: serie_mensual(hasta_hoy.get(tipo, res[tipo]), start, end) for tipo in SERIES_RESUMEN
+        }
+        for meta in metas:
+            tipo = meta[:-len("_goal")]
+            resumen[meta] = serie_metas(res[tipo], res[meta], res["income"])
+        return resumen
+
+    return await cacheado(request, db, "summary", user_id, periodo, RESUMEN, calcular)
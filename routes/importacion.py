@@ -1,165 +1,137 @@
 from fastapi import APIRouter, UploadFile, File, Form, HTTPException, Depends
 from sqlalchemy.orm import Session
-import csv
+from typing import List
 import io
-from datetime import datetime
 from db import get_db
-from models import Income, Expense, Saving, Investment, ExpenseGoal, SavingGoal, InvestmentGoal
+from services.escritura import CONFLICTOS
+from services.trabajos_importacion import crear_trabajo, estado_trabajo
+from services.importacion import (
+    TIPOS_REGISTROS,
+    TIPOS_METAS,
+    ColumnasFaltantes,
+    ErroresCSV,
+    ArchivoInvalido,
+    importar_stream,
+    importar_varios,
+    extraer_archivos,
+    eliminar_archivos,
+)
 
 router = APIRouter()
 
-# Mapeo de tipos de registros a sus modelos y columnas requeridas
-TIPOS_REGISTROS = {
-    'expense': {
-        'modelo': Expense,
-        'columnas': {'date', 'amount', 'category'},
-        'tiene_categoria': True
-    },
-    'income': {
-        'modelo': Income,
-        'columnas': {'date', 'amount'},
-        'tiene_categoria': False
-    },
-    'saving': {
-        'modelo': Saving,
-        'columnas': {'date', 'amount', 'category'},
-        'tiene_categoria': True
-    },
-    'investment': {
-        'modelo': Investment,
-        'columnas': {'date', 'amount', 'category'},
-        'tiene_categoria': True
-    }
-}
-
-# Mapeo de tipos de metas
-TIPOS_METAS = {
-    'expense_goal': {
-        'modelo': ExpenseGoal,
-        'columnas': {'date', 'value'},
-        'tiene_categoria': False
-    },
-    'saving_goal': {
-        'modelo': SavingGoal,
-        'columnas': {'date', 'value'},
-        'tiene_categoria': False
-    },
-    'investment_goal': {
-        'modelo': InvestmentGoal,
-        'columnas': {'date', 'value'},
-        'tiene_categoria': False
-    }
-}
-
-def validar_fecha(fecha_str):
-    try:
-        return datetime.strptime(fecha_str, "%Y-%m-%d").date()
-    except ValueError:
-        return None
-
-def validar_monto(monto_str):
-    try:
-        # Reemplazar coma por punto y eliminar espacios
-        monto_str = monto_str.replace(',', '.').strip()
-        monto = float(monto_str)
-        return monto if monto >= 0 else None
-    except (ValueError, TypeError):
-        return None
+def validar_tipo(tipo: str):
+    # Validar tipo de registro
+    if tipo not in {**TIPOS_REGISTROS, **TIPOS_METAS}:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Tipo '{tipo}' no soportado. Tipos válidos: {', '.join({**TIPOS_REGISTROS, **TIPOS_METAS}.keys())}"
+        )
 
-def validar_categoria(categoria):
-    return categoria.strip() if categoria else None
+def validar_conflicto(conflicto: str):
+    if conflicto not in CONFLICTOS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Conflicto '{conflicto}' no soportado. Opciones válidas: {', '.join(CONFLICTOS)}"
+        )
 
 @router.post("/importar")
-async def importar_csv(
+def importar_csv(
     file: UploadFile = File(...),
     tipo: str = Form(...),
     user_id: int = Form(...),
+    conflicto: str = Form("error"),
     db: Session = Depends(get_db)
 ):
-    # Validar tipo de registro
-    if tipo not in {**TIPOS_REGISTROS, **TIPOS_METAS}:
-        raise HTTPException(
-            status_code=400,
-            detail=f"Tipo '{tipo}' no soportado. Tipos válidos: {', '.join({**TIPOS_REGISTROS, **TIPOS_METAS}.keys())}"
-        )
+    validar_tipo(tipo)
+    validar_conflicto(conflicto)
 
-    # Obtener configuración del tipo
-    config = TIPOS_REGISTROS.get(tipo) or TIPOS_METAS.get(tipo)
-    
     try:
-        contenido = await file.read()
-        contenido_str = contenido.decode('utf-8')
-        csv_file = io.StringIO(contenido_str)
-        reader = csv.DictReader(csv_file)
-
-        # Validar columnas requeridas
-        if not config['columnas'].issubset(reader.fieldnames):
+        # Leer el archivo subido de forma incremental en lugar de cargarlo completo en memoria
+        texto = io.TextIOWrapper(file.file, encoding='utf-8', newline='')
+        try:
+            importados = importar_stream(db, texto, tipo, user_id, conflicto)
+        except ColumnasFaltantes as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        except ErroresCSV as e:
             raise HTTPException(
                 status_code=400,
-                detail=f"El archivo CSV debe contener las columnas: {', '.join(config['columnas'])}"
+                detail={"mensaje": "Errores en el CSV", "errores": e.errores}
             )
+        finally:
+            texto.detach()
 
-        errores = []
-        registros_validos = []
-
-        for idx, row in enumerate(reader, 1):
-            # Validar fecha
-            fecha = validar_fecha(row['date'])
-            if not fecha:
-                errores.append(f"Línea {idx}: Fecha inválida (formato YYYY-MM-DD)")
-                continue
+        db.commit()
+        return {
+            "mensaje": f"{importados} registros importados correctamente",
+            "tipo": tipo,
+            "registros_importados": importados
+        }
 
-            # Validar monto (amount o value según el tipo)
-            campo_monto = 'value' if tipo in TIPOS_METAS else 'amount'
-            monto = validar_monto(row[campo_monto])
-            if monto is None:
-                errores.append(f"Línea {idx}: Monto inválido")
-                continue
+    except HTTPException:
+        db.rollback()
+        raise
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(status_code=500, detail=str(e))
 
-            # Validar categoría si es necesario
-            categoria = None
-            if config['tiene_categoria']:
-                categoria = validar_categoria(row['category'])
-                if not categoria:
-                    errores.append(f"Línea {idx}: Categoría inválida")
-                    continue
+# Varios archivos (o un zip) de distintos tipos en una sola transacción.
+# El tipo se indica con el nombre de cada archivo: expense.csv, income.csv, saving_goal.csv...
+@router.post("/importar-multiple")
+def importar_multiple(
+    files: List[UploadFile] = File(...),
+    user_id: int = Form(...),
+    conflicto: str = Form("error"),
+    db: Session = Depends(get_db)
+):
+    validar_conflicto(conflicto)
 
-            registros_validos.append({
-                'fecha': fecha,
-                'monto': monto,
-                'categoria': categoria
-            })
+    try:
+        rutas = extraer_archivos([(f.filename or "", f.file) for f in files])
+    except ArchivoInvalido as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
-        if errores:
+    try:
+        try:
+            importados = importar_varios(db, rutas, user_id, conflicto)
+        except ErroresCSV as e:
             raise HTTPException(
                 status_code=400,
-                detail={"mensaje": "Errores en el CSV", "errores": errores}
+                detail={"mensaje": "Errores en el CSV", "errores": e.errores}
             )
 
-        # Insertar registros válidos en la base de datos
-        for registro in registros_validos:
-            if tipo in TIPOS_METAS:
-                nuevo = config['modelo'](
-                    user_id=user_id,
-                    date=registro['fecha'],
-                    value=registro['monto']
-                )
-            else:
-                nuevo = config['modelo'](
-                    user_id=user_id,
-                    date=registro['fecha'],
-                    amount=registro['monto'],
-                    category=registro['categoria'] if config['tiene_categoria'] else None
-                )
-            db.add(nuevo)
-
         db.commit()
+        total = sum(importados.values())
         return {
-            "mensaje": f"{len(registros_validos)} registros importados correctamente",
-            "tipo": tipo,
-            "registros_importados": len(registros_validos)
+            "mensaje": f"{total} registros importados correctamente",
+            "registros_importados": importados
         }
 
+    except HTTPException:
+        db.rollback()
+        raise
     except Exception as e:
         db.rollback()
         raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        eliminar_archivos(rutas)
+
+# Importación en segundo plano: responde de inmediato con el id del trabajo
+@router.post("/trabajos", status_code=202)
+def crear_trabajo_importacion(
+    file: UploadFile = File(...),
+    tipo: str = Form(...),
+    user_id: int = Form(...),
+    conflicto: str = Form("error"),
+    db: Session = Depends(get_db)
+):
+    validar_tipo(tipo)
+    validar_conflicto(conflicto)
+    job = crear_trabajo(db, file.file, tipo, user_id, conflicto)
+    return {"job_id": job.id, "estado": job.estado}
+
+@router.get("/trabajos/{job_id}")
+def get_trabajo_importacion(job_id: int, db: Session = Depends(get_db)):
+    estado = estado_trabajo(db, job_id)
+    if not estado:
+        raise HTTPException(status_code=404, detail="Trabajo de importación no encontrado")
+    return estado
@@ -1,11 +1,13 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from sqlalchemy import func, extract
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import func, select
 from datetime import datetime, date
 from typing import List
-from db.db import get_db
+from db.db import get_async_db
 from models.income import Income
 from schemas.income import IncomeCreate, IncomeRead
+from services.rollup import refrescar_async
+from services.repositorio import crear_registro_async, RegistroExistente
 from fastapi.security import HTTPAuthorizationCredentials
 from .auth import security
 
@@ -15,7 +17,7 @@ router = APIRouter()
 async def get_current_month_income(
     user_id: int,
     credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Obtiene el total de ingresos del mes actual para un usuario"""
     today = date.today()
@@ -29,11 +31,13 @@ async def get_current_month_income(
             break
     last_day = last_day.replace(day=last_day.day - 1)
     
-    total = db.query(func.coalesce(func.sum(Income.amount), 0)).filter(
-        Income.user_id == user_id,
-        Income.date >= first_day,
-        Income.date <= last_day
-    ).scalar()
+    total = (await db.execute(
+        select(func.coalesce(func.sum(Income.amount), 0)).where(
+            Income.user_id == user_id,
+            Income.date >= first_day,
+            Income.date <= last_day
+        )
+    )).scalar()
     
     return total if total is not None else 0.0
 
@@ -41,26 +45,31 @@ async def get_current_month_income(
 async def create_income(
     user_id: int,
     income: IncomeCreate,
+    upsert: bool = Query(False, description="Si ya hay un ingreso en esa fecha, lo reemplaza"),
     credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Crea un nuevo registro de ingreso para un usuario"""
     if income.amount < 0:
         raise HTTPException(status_code=400, detail="El monto no puede ser negativo")
     
-    db_income = Income(
-        user_id=user_id,
-        date=income.date,
-        amount=income.amount
-    )
-    
     try:
-        db.add(db_income)
-        db.commit()
-        db.refresh(db_income)
+        db_income = await crear_registro_async(db, Income, {
+            "user_id": user_id,
+            "date": income.date,
+            "amount": income.amount
+        }, "sobrescribir" if upsert else "error")
+        await refrescar_async(db, user_id, "income", [income.date])
+        await db.commit()
         return db_income
+    except RegistroExistente:
+        await db.rollback()
+        raise HTTPException(
+            status_code=400,
+            detail="Ya existe un ingreso registrado para esta fecha. Use el endpoint PUT para actualizarlo."
+        )
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=400, detail=str(e))
 
 @router.put("/{user_id}/{date}", response_model=IncomeRead)
@@ -69,16 +78,18 @@ async def update_income(
     date: date,
     income: IncomeCreate,
     credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Actualiza un registro de ingreso existente"""
     if income.amount < 0:
         raise HTTPException(status_code=400, detail="El monto no puede ser negativo")
     
-    db_income = db.query(Income).filter(
-        Income.user_id == user_id,
-        Income.date == date
-    ).first()
+    db_income = (await db.execute(
+        select(Income).where(
+            Income.user_id == user_id,
+            Income.date == date
+        )
+    )).scalars().first()
     
     if not db_income:
         raise HTTPException(status_code=404, detail="Registro de ingreso no encontrado")
@@ -87,9 +98,9 @@ async def update_income(
     db_income.date = income.date
     
     try:
-        db.commit()
-        db.refresh(db_income)
+        await refrescar_async(db, user_id, "income", [date, income.date])
+        await db.commit()
         return db_income
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=400, detail=str(e))
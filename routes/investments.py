@@ -1,12 +1,19 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Query, Request, Response
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select
 from typing import List, Optional
 from datetime import date
 from pydantic import BaseModel, Field, validator
 from enum import Enum
 
-from db.db import get_db
+from db.db import get_db, get_async_db
 from models.investment import Investment
+from services.rollup import refrescar
+from services.repositorio import crear_registro, RegistroExistente
+from services.versiones import version_datos, etag, no_modificado
+from services.respuestas import RESPUESTAS_RAPIDAS, RespuestaRapida, filas_a_dicts
+from services.paginacion import listar_pagina, PAGINA_DEFECTO, PAGINA_MAX, CABECERA_CURSOR
 
 router = APIRouter(
     prefix="/datos/inversiones",
@@ -39,12 +46,37 @@ class InvestmentUpdate(BaseModel):
     amount: float = Field(..., gt=0, description="El monto debe ser mayor que 0")
     category: Optional[InvestmentCategory] = None
 
+# Columnas de cada elemento del listado
+COLUMNAS = ["date", "amount", "category"]
+
 @router.get("/{user_id}", response_model=List[dict])
-def get_investments(user_id: int, db: Session = Depends(get_db)):
+async def get_investments(
+    user_id: int,
+    request: Request,
+    response: Response,
+    limit: int = Query(PAGINA_DEFECTO, ge=1, le=PAGINA_MAX),
+    cursor: Optional[date] = Query(None, description="Valor de la cabecera X-Next-Cursor de la página anterior"),
+    desde: Optional[date] = None,
+    hasta: Optional[date] = None,
+    category: Optional[InvestmentCategory] = None,
+    db: AsyncSession = Depends(get_async_db)
+):
     try:
-        investments = db.query(Investment).filter(
-            Investment.user_id == user_id
-        ).all()
+        valor_etag = etag(await version_datos(db, user_id))
+        if no_modificado(request.headers.get("if-none-match"), valor_etag):
+            return Response(status_code=304, headers={"ETag": valor_etag})
+        response.headers["ETag"] = valor_etag
+
+        filtros = (cursor, desde, hasta, category.value if category else None)
+        if RESPUESTAS_RAPIDAS:
+            filas, siguiente = await listar_pagina(db, Investment, user_id, limit, *filtros, columnas=COLUMNAS)
+            if siguiente:
+                response.headers[CABECERA_CURSOR] = siguiente
+            return RespuestaRapida(filas_a_dicts(COLUMNAS, filas), headers=dict(response.headers))
+
+        investments, siguiente = await listar_pagina(db, Investment, user_id, limit, *filtros)
+        if siguiente:
+            response.headers[CABECERA_CURSOR] = siguiente
         return [
             {
                 "date": investment.date,
@@ -57,12 +89,14 @@ def get_investments(user_id: int, db: Session = Depends(get_db)):
         raise HTTPException(status_code=400, detail=str(e))
 
 @router.get("/{user_id}/{date}", response_model=dict)
-def get_investment_by_date(user_id: int, date: date, db: Session = Depends(get_db)):
+async def get_investment_by_date(user_id: int, date: date, db: AsyncSession = Depends(get_async_db)):
     try:
-        investment = db.query(Investment).filter(
-            Investment.user_id == user_id,
-            Investment.date == date
-        ).first()
+        investment = (await db.execute(
+            select(Investment).where(
+                Investment.user_id == user_id,
+                Investment.date == date
+            )
+        )).scalars().first()
         
         if not investment:
             raise HTTPException(status_code=404, detail="Inversión no encontrada")
@@ -76,29 +110,29 @@ def get_investment_by_date(user_id: int, date: date, db: Session = Depends(get_d
         raise HTTPException(status_code=400, detail=str(e))
 
 @router.post("/{user_id}")
-def create_investment(user_id: int, investment: InvestmentCreate, db: Session = Depends(get_db)):
+def create_investment(
+    user_id: int,
+    investment: InvestmentCreate,
+    upsert: bool = Query(False, description="Si ya hay un registro en esa fecha, lo reemplaza"),
+    db: Session = Depends(get_db)
+):
     try:
-        existing_investment = db.query(Investment).filter(
-            Investment.user_id == user_id,
-            Investment.date == investment.investment_date
-        ).first()
-        
-        if existing_investment:
+        try:
+            data = crear_registro(db, Investment, {
+                "user_id": user_id,
+                "date": investment.investment_date,
+                "amount": investment.amount,
+                "category": investment.category.value,
+            }, "sobrescribir" if upsert else "error")
+        except RegistroExistente:
             raise HTTPException(
                 status_code=400,
                 detail="Ya existe una inversión registrada para esta fecha. Use el endpoint PUT para actualizarla."
             )
 
-        new_investment = Investment(
-            user_id=user_id,
-            amount=investment.amount,
-            category=investment.category,
-            date=investment.investment_date
-        )
-        db.add(new_investment)
+        refrescar(db, user_id, "investment", [investment.investment_date])
         db.commit()
-        db.refresh(new_investment)
-        return {"message": "Inversión creada exitosamente", "data": new_investment}
+        return {"message": "Inversión creada exitosamente", "data": data}
     except Exception as e:
         db.rollback()
         raise HTTPException(status_code=400, detail=str(e))
@@ -117,7 +151,8 @@ def update_investment(user_id: int, date: date, investment: InvestmentUpdate, db
         investment_db.amount = investment.amount
         if investment.category is not None:
             investment_db.category = investment.category
-            
+
+        refrescar(db, user_id, "investment", [date])
         db.commit()
         return {"message": "Inversión actualizada exitosamente", "data": investment_db}
     except Exception as e:
@@ -136,6 +171,7 @@ def delete_investment(user_id: int, date: date, db: Session = Depends(get_db)):
             raise HTTPException(status_code=404, detail="Inversión no encontrada")
         
         db.delete(investment)
+        refrescar(db, user_id, "investment", [date])
         db.commit()
         return {"message": "Inversión eliminada exitosamente"}
     except Exception as e:
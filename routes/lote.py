@@ -0,0 +1,50 @@
+from fastapi import APIRouter, HTTPException, Depends
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy.orm import Session
+from db.db import get_db
+from schemas.lote import LoteRequest
+from services.lote import aplicar_lote, LOTE_MAX_OPERACIONES
+from .expenses import ExpenseCategory
+from .savings import SavingCategory
+from .investments import InvestmentCategory
+
+router = APIRouter(
+    prefix="/datos/lote",
+    tags=["lote"]
+)
+
+CATEGORIAS = {
+    "expense": {c.value for c in ExpenseCategory},
+    "saving": {c.value for c in SavingCategory},
+    "investment": {c.value for c in InvestmentCategory},
+}
+
+# Varias altas, modificaciones y bajas de cualquier tipo en una sola transacción y un solo commit
+@router.post("/{user_id}")
+def aplicar_operaciones(user_id: int, lote: LoteRequest, db: Session = Depends(get_db)):
+    if len(lote.operaciones) > LOTE_MAX_OPERACIONES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"El lote admite como máximo {LOTE_MAX_OPERACIONES} operaciones"
+        )
+
+    try:
+        resultados = aplicar_lote(db, user_id, lote.operaciones, CATEGORIAS)
+        fallidas = sum(1 for r in resultados if not r["ok"])
+        if lote.atomico and fallidas:
+            db.rollback()
+            raise HTTPException(
+                status_code=400,
+                detail={"mensaje": "El lote no se aplicó: hay operaciones con errores", "resultados": jsonable_encoder(resultados)}
+            )
+        db.commit()
+        return {
+            "aplicadas": len(resultados) - fallidas,
+            "fallidas": fallidas,
+            "resultados": resultados
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(status_code=400, detail=str(e))
@@ -0,0 +1,19 @@
+from fastapi import APIRouter
+from db import estadisticas_pools
+from services.cache_usuarios import cache_usuarios
+from services.cache_historial import cache_historial
+from services.contrasenas import ejecutor_contrasenas
+
+router = APIRouter(
+    prefix="/metricas",
+    tags=["metricas"]
+)
+
+@router.get("")
+def get_metricas():
+    return {
+        "cache_usuarios": cache_usuarios.estadisticas(),
+        "cache_historial": cache_historial.estadisticas(),
+        "contrasenas": ejecutor_contrasenas.estadisticas(),
+        "pool_conexiones": estadisticas_pools(),
+    }
@@ -1,65 +1,86 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from datetime import datetime
-from db import get_db
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from datetime import datetime, date
+from db import get_async_db
 from models.user import User
 from models.expense_goal import ExpenseGoal
 from models.saving_goal import SavingGoal
 from models.investment_goal import InvestmentGoal
 from schemas.user import PerfilUpdate
 from routes.auth import get_current_user
-from routes.auth import get_password_hash
-from sqlalchemy import extract
+from routes.auth import hash_o_503
+from services.contrasenas import hash_password
+from services.rollup import refrescar_async
+from services.repositorio import crear_registro_async
+from services.cache_usuarios import cache_usuarios, UsuarioCacheado
+from services.cambios import registrar_cambio_async
+from services.versiones import version_datos, etag, no_modificado
+from sqlalchemy import extract, select
 
 router = APIRouter()
 
 @router.get("/perfil")
-def get_user_profile(current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+async def get_user_profile(
+    request: Request,
+    response: Response,
+    current_user: UsuarioCacheado = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    # Las metas mostradas son las del mes en curso: el día forma parte del ETag
+    valor_etag = etag(await version_datos(db, current_user.id), date.today().isoformat())
+    if no_modificado(request.headers.get("if-none-match"), valor_etag):
+        return Response(status_code=304, headers={"ETag": valor_etag})
+    response.headers["ETag"] = valor_etag
     return {
         "id": current_user.id,
         "email": current_user.email,
         "username": current_user.username,
-        "meta_gasto": get_meta(db, ExpenseGoal, current_user.id),
-        "meta_ahorro": get_meta(db, SavingGoal, current_user.id),
-        "meta_inversion": get_meta(db, InvestmentGoal, current_user.id),
+        "meta_gasto": await get_meta(db, ExpenseGoal, current_user.id),
+        "meta_ahorro": await get_meta(db, SavingGoal, current_user.id),
+        "meta_inversion": await get_meta(db, InvestmentGoal, current_user.id),
     }
 
 @router.put("/perfil")
-def update_user_profile(
+async def update_user_profile(
     perfil: PerfilUpdate,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: UsuarioCacheado = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
+    # bcrypt en su pool dedicado; la base de datos con la sesión async
+    hashed_password = await hash_o_503(hash_password, perfil.password) if perfil.password else None
     cambios_credenciales = False
 
+    # current_user es la identidad en caché; los cambios se hacen sobre la fila real
+    user = await db.get(User, current_user.id)
+    await registrar_cambio_async(db, user.id)
     if perfil.email:
-        current_user.email = perfil.email
-    if perfil.username and perfil.username != current_user.username:
-        current_user.username = perfil.username
+        user.email = perfil.email
+    if perfil.username and perfil.username != user.username:
+        user.username = perfil.username
         cambios_credenciales = True
-    if perfil.password:
-        current_user.password = get_password_hash(perfil.password)
+    if hashed_password:
+        user.password = hashed_password
         cambios_credenciales = True
 
-    db.commit()
+    await db.commit()
+    cache_usuarios.invalidar(user.id)
 
     hoy = datetime.now().date()
+    await registrar_cambio_async(db, current_user.id)
 
     # Actualizar o insertar metas
-    def upsert_meta(model, value):
+    async def upsert_meta(model, value):
         if value is None:
             return
-        existente = db.query(model).filter_by(user_id=current_user.id, date=hoy).first()
-        if existente:
-            existente.value = value
-        else:
-            db.add(model(user_id=current_user.id, value=value, date=hoy))
+        await crear_registro_async(db, model, {"user_id": current_user.id, "date": hoy, "value": value}, "sobrescribir")
 
-    upsert_meta(ExpenseGoal, perfil.meta_gasto)
-    upsert_meta(SavingGoal, perfil.meta_ahorro)
-    upsert_meta(InvestmentGoal, perfil.meta_inversion)
+    await upsert_meta(ExpenseGoal, perfil.meta_gasto)
+    await upsert_meta(SavingGoal, perfil.meta_ahorro)
+    await upsert_meta(InvestmentGoal, perfil.meta_inversion)
 
-    db.commit()
+    for tipo in ("expense_goal", "saving_goal", "investment_goal"):
+        await refrescar_async(db, current_user.id, tipo, [hoy])
+    await db.commit()
 
     return {
         "message": "Perfil actualizado correctamente",
@@ -67,19 +88,23 @@ def update_user_profile(
     }
 
 
-def get_meta(db: Session, model, user_id: int):
+async def get_meta(db: AsyncSession, model, user_id: int):
     hoy = datetime.now()
-    actual = db.query(model).filter(
-        model.user_id == user_id,
-        extract("month", model.date) == hoy.month,
-        extract("year", model.date) == hoy.year
-    ).order_by(model.date.desc()).first()
+    actual = (await db.execute(
+        select(model).where(
+            model.user_id == user_id,
+            extract("month", model.date) == hoy.month,
+            extract("year", model.date) == hoy.year
+        ).order_by(model.date.desc()).limit(1)
+    )).scalars().first()
 
     if actual:
         return actual.value
 
-    anterior = db.query(model).filter(model.user_id == user_id)\
-        .order_by(model.date.desc()).first()
+    anterior = (await db.execute(
+        select(model).where(model.user_id == user_id)
+        .order_by(model.date.desc()).limit(1)
+    )).scalars().first()
 
     if anterior:
         return anterior.value
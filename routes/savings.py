@@ -1,12 +1,19 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Query, Request, Response
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select
 from typing import List, Optional
 from datetime import date
 from pydantic import BaseModel, Field, validator
 from enum import Enum
 
-from db.db import get_db
+from db.db import get_db, get_async_db
 from models.saving import Saving
+from services.rollup import refrescar
+from services.repositorio import crear_registro, RegistroExistente
+from services.versiones import version_datos, etag, no_modificado
+from services.respuestas import RESPUESTAS_RAPIDAS, RespuestaRapida, filas_a_dicts
+from services.paginacion import listar_pagina, PAGINA_DEFECTO, PAGINA_MAX, CABECERA_CURSOR
 
 router = APIRouter(
     prefix="/datos/ahorros",
@@ -38,12 +45,37 @@ class SavingUpdate(BaseModel):
     amount: float = Field(..., gt=0, description="El monto debe ser mayor que 0")
     category: Optional[SavingCategory] = None
 
+# Columnas de cada elemento del listado
+COLUMNAS = ["date", "amount", "category"]
+
 @router.get("/{user_id}", response_model=List[dict])
-def get_savings(user_id: int, db: Session = Depends(get_db)):
+async def get_savings(
+    user_id: int,
+    request: Request,
+    response: Response,
+    limit: int = Query(PAGINA_DEFECTO, ge=1, le=PAGINA_MAX),
+    cursor: Optional[date] = Query(None, description="Valor de la cabecera X-Next-Cursor de la página anterior"),
+    desde: Optional[date] = None,
+    hasta: Optional[date] = None,
+    category: Optional[SavingCategory] = None,
+    db: AsyncSession = Depends(get_async_db)
+):
     try:
-        savings = db.query(Saving).filter(
-            Saving.user_id == user_id
-        ).all()
+        valor_etag = etag(await version_datos(db, user_id))
+        if no_modificado(request.headers.get("if-none-match"), valor_etag):
+            return Response(status_code=304, headers={"ETag": valor_etag})
+        response.headers["ETag"] = valor_etag
+
+        filtros = (cursor, desde, hasta, category.value if category else None)
+        if RESPUESTAS_RAPIDAS:
+            filas, siguiente = await listar_pagina(db, Saving, user_id, limit, *filtros, columnas=COLUMNAS)
+            if siguiente:
+                response.headers[CABECERA_CURSOR] = siguiente
+            return RespuestaRapida(filas_a_dicts(COLUMNAS, filas), headers=dict(response.headers))
+
+        savings, siguiente = await listar_pagina(db, Saving, user_id, limit, *filtros)
+        if siguiente:
+            response.headers[CABECERA_CURSOR] = siguiente
         return [
             {
                 "date": saving.date,
@@ -56,12 +88,14 @@ def get_savings(user_id: int, db: Session = Depends(get_db)):
         raise HTTPException(status_code=400, detail=str(e))
 
 @router.get("/{user_id}/{date}", response_model=dict)
-def get_saving_by_date(user_id: int, date: date, db: Session = Depends(get_db)):
+async def get_saving_by_date(user_id: int, date: date, db: AsyncSession = Depends(get_async_db)):
     try:
-        saving = db.query(Saving).filter(
-            Saving.user_id == user_id,
-            Saving.date == date
-        ).first()
+        saving = (await db.execute(
+            select(Saving).where(
+                Saving.user_id == user_id,
+                Saving.date == date
+            )
+        )).scalars().first()
         
         if not saving:
             raise HTTPException(status_code=404, detail="Ahorro no encontrado")
@@ -75,29 +109,29 @@ def get_saving_by_date(user_id: int, date: date, db: Session = Depends(get_db)):
         raise HTTPException(status_code=400, detail=str(e))
 
 @router.post("/{user_id}")
-def create_saving(user_id: int, saving: SavingCreate, db: Session = Depends(get_db)):
+def create_saving(
+    user_id: int,
+    saving: SavingCreate,
+    upsert: bool = Query(False, description="Si ya hay un registro en esa fecha, lo reemplaza"),
+    db: Session = Depends(get_db)
+):
     try:
-        existing_saving = db.query(Saving).filter(
-            Saving.user_id == user_id,
-            Saving.date == saving.income_date
-        ).first()
-        
-        if existing_saving:
+        try:
+            data = crear_registro(db, Saving, {
+                "user_id": user_id,
+                "date": saving.income_date,
+                "amount": saving.amount,
+                "category": saving.category.value,
+            }, "sobrescribir" if upsert else "error")
+        except RegistroExistente:
             raise HTTPException(
                 status_code=400,
                 detail="Ya existe un ahorro registrado para esta fecha. Use el endpoint PUT para actualizarlo."
             )
 
-        new_saving = Saving(
-            user_id=user_id,
-            amount=saving.amount,
-            category=saving.category,
-            date=saving.income_date
-        )
-        db.add(new_saving)
+        refrescar(db, user_id, "saving", [saving.income_date])
         db.commit()
-        db.refresh(new_saving)
-        return {"message": "Ahorro creado exitosamente", "data": new_saving}
+        return {"message": "Ahorro creado exitosamente", "data": data}
     except Exception as e:
         db.rollback()
         raise HTTPException(status_code=400, detail=str(e))
@@ -116,7 +150,8 @@ def update_saving(user_id: int, date: date, saving: SavingUpdate, db: Session =
         saving_db.amount = saving.amount
         if saving.category is not None:
             saving_db.category = saving.category
-            
+
+        refrescar(db, user_id, "saving", [date])
         db.commit()
         return {"message": "Ahorro actualizado exitosamente", "data": saving_db}
     except Exception as e:
@@ -135,6 +170,7 @@ def delete_saving(user_id: int, date: date, db: Session = Depends(get_db)):
             raise HTTPException(status_code=404, detail="Ahorro no encontrado")
         
         db.delete(saving)
+        refrescar(db, user_id, "saving", [date])
         db.commit()
         return {"message": "Ahorro eliminado exitosamente"}
     except Exception as e:
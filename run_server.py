@@ -10,6 +10,8 @@ if __name__ == "__main__":
     ]
 
     try:
+        # La app solo comprueba la versión del esquema; las migraciones se aplican aquí
+        subprocess.run([sys.executable, "-m", "db.migraciones", "actualizar"], check=True)
         print("Starting FastAPI server with HTTPS...")
         subprocess.run(command)
     except KeyboardInterrupt:
@@ -24,4 +24,7 @@ from .investment_goal import InvestmentGoalCreate, InvestmentGoalRead
 
 from .finance_history_record import FinanceHistoryRecord
 
-from .goal_history_record import GoalHistoryRecord
\ No newline at end of file
+from .goal_history_record import GoalHistoryRecord
+
+from .history_summary import HistorySummary
+from .lote import OperacionLote, LoteRequest
@@ -0,0 +1,13 @@
+from typing import List
+from pydantic import BaseModel
+from .finance_history_record import FinanceHistoryRecord
+from .goal_history_record import GoalHistoryRecord
+
+class HistorySummary(BaseModel):
+    income: List[FinanceHistoryRecord]
+    expense: List[FinanceHistoryRecord]
+    saving: List[FinanceHistoryRecord]
+    investment: List[FinanceHistoryRecord]
+    expense_goal: List[GoalHistoryRecord]
+    saving_goal: List[GoalHistoryRecord]
+    investment_goal: List[GoalHistoryRecord]
@@ -0,0 +1,15 @@
+from datetime import date
+from typing import List, Literal, Optional
+from pydantic import BaseModel, Field
+
+class OperacionLote(BaseModel):
+    op: Literal["crear", "actualizar", "eliminar"]
+    tipo: Literal["income", "expense", "saving", "investment"]
+    date: date
+    amount: Optional[float] = Field(None, ge=0)  # como POST /api/incomes: admite 0, no negativos
+    category: Optional[str] = None
+    upsert: bool = False  # solo para crear: reemplaza el registro de esa fecha si existe
+
+class LoteRequest(BaseModel):
+    operaciones: List[OperacionLote] = Field(..., min_length=1)
+    atomico: bool = False  # si alguna operación falla no se aplica ninguna
@@ -0,0 +1,147 @@
+import importlib
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from services.cambios import al_confirmar, TODOS
+
+logger = logging.getLogger(__name__)
+
+# Respuestas JSON ya serializadas de /history, por (endpoint, usuario, periodo, día).
+# La caché en memoria es de un solo proceso: las invalidaciones no llegan a los demás
+# workers, que pueden servir el histórico (y sus 304) desactualizado hasta TTL segundos.
+# Con varios workers (uvicorn --workers, gunicorn) hay que configurar HISTORIAL_CACHE_BACKEND
+# o desactivarla con HISTORIAL_CACHE_MAX=0.
+TTL_SEGUNDOS = float(os.getenv("HISTORIAL_CACHE_TTL", "30"))
+MAX_ENTRADAS = int(os.getenv("HISTORIAL_CACHE_MAX", "5000"))
+# Backend compartido ("modulo:Clase") con la misma interfaz que CacheHistorial, p. ej.
+# sobre Redis, para que varios workers compartan entradas e invalidaciones
+BACKEND = os.getenv("HISTORIAL_CACHE_BACKEND", "")
+
+def clave_historial(endpoint: str, user_id: int, periodo: str, hoy: str) -> str:
+    return f"{endpoint}:{user_id}:{periodo}:{hoy}"
+
+class CacheHistorial:
+    """Caché LRU en memoria con expiración e invalidación por usuario, segura entre hilos."""
+
+    def __init__(self, ttl: float = TTL_SEGUNDOS, max_entradas: int = MAX_ENTRADAS):
+        self.ttl = ttl
+        self.max_entradas = max_entradas
+        self._datos = OrderedDict()  # clave -> (expira, user_id, etag, contenido)
+        self._por_usuario = {}       # user_id -> claves
+        self._invalidado = {}        # user_id -> momento de la última invalidación, en orden
+        self._invalidado_todo = 0.0
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.aciertos = 0
+        self.fallos = 0
+        self.invalidaciones = 0
+
+    def _quitar(self, clave):
+        _, user_id, _, contenido = self._datos.pop(clave)
+        self.bytes -= len(contenido)
+        claves = self._por_usuario.get(user_id)
+        if claves is not None:
+            claves.discard(clave)
+            if not claves:
+                del self._por_usuario[user_id]
+
+    def obtener(self, clave: str):
+        """Devuelve (etag, contenido) o None."""
+        with self._lock:
+            entrada = self._datos.get(clave)
+            if entrada is None or entrada[0] < time.monotonic():
+                if entrada is not None:
+                    self._quitar(clave)
+                self.fallos += 1
+                return None
+            self._datos.move_to_end(clave)
+            self.aciertos += 1
+            return entrada[2], entrada[3]
+
+    def guardar(self, user_id: int, clave: str, etag: str, contenido: bytes, calculado_desde: float | None = None):
+        """
+        `calculado_desde` (time.monotonic() antes de leer la base) evita guardar una respuesta
+        calculada antes de una invalidación que llegó mientras se calculaba. Tampoco se guarda
+        si empezó hace más de un TTL: las invalidaciones más antiguas ya se han olvidado.
+        """
+        if self.max_entradas <= 0:
+            return
+        with self._lock:
+            if calculado_desde is not None and (
+                calculado_desde < time.monotonic() - self.ttl
+                or calculado_desde <= max(self._invalidado.get(user_id, 0.0), self._invalidado_todo)
+            ):
+                return
+            if clave in self._datos:
+                self._quitar(clave)
+            self._datos[clave] = (time.monotonic() + self.ttl, user_id, etag, contenido)
+            self._por_usuario.setdefault(user_id, set()).add(clave)
+            self.bytes += len(contenido)
+            while len(self._datos) > self.max_entradas:
+                self._quitar(next(iter(self._datos)))
+
+    def invalidar_usuario(self, user_id):
+        if user_id is TODOS:
+            self.limpiar()
+            return
+        with self._lock:
+            for clave in list(self._por_usuario.get(user_id, ())):
+                self._quitar(clave)
+            ahora = time.monotonic()
+            # Al final del dict, para que quede ordenado por momento de invalidación
+            self._invalidado.pop(user_id, None)
+            self._invalidado[user_id] = ahora
+            self._podar_invalidaciones(ahora)
+            self.invalidaciones += 1
+
+    def _podar_invalidaciones(self, ahora: float):
+        # Las marcas de hace más de un TTL ya no protegen nada (guardar descarta esos cálculos)
+        limite = ahora - self.ttl
+        while self._invalidado:
+            user_id, momento = next(iter(self._invalidado.items()))
+            if momento >= limite:
+                break
+            del self._invalidado[user_id]
+
+    def limpiar(self):
+        with self._lock:
+            self._datos.clear()
+            self._por_usuario.clear()
+            self._invalidado.clear()
+            self._invalidado_todo = time.monotonic()
+            self.bytes = 0
+            self.invalidaciones += 1
+
+    def estadisticas(self):
+        with self._lock:
+            total = self.aciertos + self.fallos
+            return {
+                "backend": "memoria",
+                "entradas": len(self._datos),
+                "max_entradas": self.max_entradas,
+                "ttl_segundos": self.ttl,
+                "bytes": self.bytes,
+                "aciertos": self.aciertos,
+                "fallos": self.fallos,
+                "tasa_aciertos": self.aciertos / total if total else 0.0,
+                "invalidaciones": self.invalidaciones,
+            }
+
+def crear_cache():
+    if not BACKEND:
+        if int(os.getenv("WEB_CONCURRENCY", "1")) > 1 and MAX_ENTRADAS > 0:
+            logger.warning(
+                "Caché del histórico en memoria con varios workers: cada uno puede servir datos "
+                "desactualizados hasta %s s. Configura HISTORIAL_CACHE_BACKEND o HISTORIAL_CACHE_MAX=0.",
+                TTL_SEGUNDOS,
+            )
+        return CacheHistorial()
+    modulo, clase = BACKEND.split(":", 1)
+    return getattr(importlib.import_module(modulo), clase)()
+
+cache_historial = crear_cache()
+
+# Cualquier commit que modifique datos de un usuario invalida sus respuestas
+al_confirmar(cache_historial.invalidar_usuario)
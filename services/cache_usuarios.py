@@ -0,0 +1,69 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+
+# Identidad de usuarios autenticados en memoria para no consultar la base en cada petición
+TTL_SEGUNDOS = float(os.getenv("USUARIOS_CACHE_TTL", "60"))
+MAX_ENTRADAS = int(os.getenv("USUARIOS_CACHE_MAX", "10000"))
+
+@dataclass(frozen=True)
+class UsuarioCacheado:
+    id: int
+    email: str
+    username: str
+
+class CacheUsuarios:
+    """Caché LRU con expiración por entrada, segura entre hilos."""
+
+    def __init__(self, ttl: float = TTL_SEGUNDOS, max_entradas: int = MAX_ENTRADAS):
+        self.ttl = ttl
+        self.max_entradas = max_entradas
+        self._datos = OrderedDict()
+        self._lock = threading.Lock()
+        self.aciertos = 0
+        self.fallos = 0
+
+    def obtener(self, user_id: int):
+        with self._lock:
+            entrada = self._datos.get(user_id)
+            if entrada is None or entrada[0] < time.monotonic():
+                if entrada is not None:
+                    del self._datos[user_id]
+                self.fallos += 1
+                return None
+            self._datos.move_to_end(user_id)
+            self.aciertos += 1
+            return entrada[1]
+
+    def guardar(self, user) -> UsuarioCacheado:
+        usuario = UsuarioCacheado(id=user.id, email=user.email, username=user.username)
+        with self._lock:
+            self._datos[user.id] = (time.monotonic() + self.ttl, usuario)
+            self._datos.move_to_end(user.id)
+            while len(self._datos) > self.max_entradas:
+                self._datos.popitem(last=False)
+        return usuario
+
+    def invalidar(self, user_id: int):
+        with self._lock:
+            self._datos.pop(user_id, None)
+
+    def limpiar(self):
+        with self._lock:
+            self._datos.clear()
+
+    def estadisticas(self):
+        with self._lock:
+            total = self.aciertos + self.fallos
+            return {
+                "entradas": len(self._datos),
+                "max_entradas": self.max_entradas,
+                "ttl_segundos": self.ttl,
+                "aciertos": self.aciertos,
+                "fallos": self.fallos,
+                "tasa_aciertos": self.aciertos / total if total else 0.0,
+            }
+
+cache_usuarios = CacheUsuarios()
@@ -0,0 +1,61 @@
+from sqlalchemy import event, update
+from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from models import User
+
+# Usuarios cuyos datos financieros cambió la transacción en curso. Se anotan en
+# session.info al escribir y se notifican solo si la transacción se confirma.
+_CLAVE = "usuarios_modificados"
+TODOS = None  # cambio que afecta a todos los usuarios (reconstrucción completa)
+
+_suscriptores = []
+
+def al_confirmar(fn):
+    """Registra fn(user_id) para cada usuario modificado tras un commit (user_id=TODOS si son todos)."""
+    _suscriptores.append(fn)
+    return fn
+
+def marcar_usuario(db, user_id) -> bool:
+    """Anota al usuario como modificado; devuelve False si ya lo estaba en esta transacción."""
+    # En AsyncSession los eventos y el info viven en la sesión síncrona subyacente
+    sesion = getattr(db, "sync_session", db)
+    usuarios = sesion.info.setdefault(_CLAVE, set())
+    if user_id in usuarios or TODOS in usuarios:
+        return False
+    usuarios.add(user_id)
+    return True
+
+def _sentencia_version(user_id):
+    stmt = update(User).values(data_version=User.data_version + 1)
+    return stmt if user_id is TODOS else stmt.where(User.id == user_id)
+
+def registrar_cambio(db: Session, user_id):
+    """
+    Marca al usuario e incrementa su data_version al empezar a escribir, una vez por
+    transacción. El UPDATE bloquea la fila del usuario hasta el commit, así que las
+    escrituras concurrentes de un mismo usuario se serializan: cada refresco del rollup
+    ve ya confirmados los cambios de la anterior (en Postgres no hay claves duplicadas
+    en monthly_rollups ni totales calculados sobre una foto vieja).
+    """
+    if marcar_usuario(db, user_id):
+        db.execute(_sentencia_version(user_id))
+
+async def registrar_cambio_async(db: AsyncSession, user_id):
+    """Igual que registrar_cambio, para sesiones asíncronas."""
+    if marcar_usuario(db, user_id):
+        await db.execute(_sentencia_version(user_id))
+
+@event.listens_for(Session, "after_commit")
+def _notificar(session):
+    usuarios = session.info.pop(_CLAVE, None)
+    if not usuarios:
+        return
+    if TODOS in usuarios:
+        usuarios = {TODOS}
+    for fn in _suscriptores:
+        for user_id in usuarios:
+            fn(user_id)
+
+@event.listens_for(Session, "after_rollback")
+def _descartar(session):
+    session.info.pop(_CLAVE, None)
@@ -0,0 +1,94 @@
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from passlib.context import CryptContext
+
+# bcrypt consume CPU durante decenas de ms; se ejecuta en un pool propio para no
+# competir con el threadpool compartido de FastAPI que atiende las lecturas.
+TRABAJADORES = int(os.getenv("HASH_TRABAJADORES", "2"))
+MAX_EN_COLA = int(os.getenv("HASH_MAX_EN_COLA", "64"))
+
+# Política de hash: esquema por defecto y coste (rounds). Los hashes con otro esquema
+# u otro coste se siguen verificando y se rehacen en segundo plano al iniciar sesión.
+HASH_ESQUEMA = os.getenv("HASH_ESQUEMA", "bcrypt")
+HASH_COSTE = os.getenv("HASH_COSTE")
+ESQUEMAS_ANTERIORES = ["bcrypt"]
+
+def crear_contexto(esquema: str = HASH_ESQUEMA, coste: str | None = HASH_COSTE) -> CryptContext:
+    opciones = {}
+    if coste:
+        # min = max = default: cualquier hash con otro coste queda fuera de la política
+        for opcion in ("default_rounds", "min_rounds", "max_rounds"):
+            opciones[f"{esquema}__{opcion}"] = int(coste)
+    esquemas = [esquema] + [e for e in ESQUEMAS_ANTERIORES if e != esquema]
+    return CryptContext(schemes=esquemas, deprecated="auto", **opciones)
+
+pwd_context = crear_contexto()
+
+class EjecutorSaturado(Exception):
+    pass
+
+class EjecutorContrasenas:
+    def __init__(self, trabajadores: int = TRABAJADORES, max_en_cola: int = MAX_EN_COLA):
+        self.trabajadores = trabajadores
+        self.max_en_cola = max_en_cola
+        self._ejecutor = ThreadPoolExecutor(max_workers=trabajadores, thread_name_prefix="contrasenas")
+        self._lock = threading.Lock()
+        self.pendientes = 0  # en cola o ejecutándose
+        self.en_curso = 0
+        self.completadas = 0
+        self.rechazadas = 0
+        self.max_pendientes = 0
+        self.espera_total = 0.0
+        self.espera_max = 0.0
+
+    def _ejecutar(self, encolada: float, fn, args):
+        espera = time.monotonic() - encolada
+        with self._lock:
+            self.en_curso += 1
+            self.espera_total += espera
+            self.espera_max = max(self.espera_max, espera)
+        try:
+            return fn(*args)
+        finally:
+            with self._lock:
+                self.en_curso -= 1
+                self.pendientes -= 1
+                self.completadas += 1
+
+    async def ejecutar(self, fn, *args):
+        with self._lock:
+            if self.pendientes >= self.max_en_cola:
+                self.rechazadas += 1
+                raise EjecutorSaturado()
+            self.pendientes += 1
+            self.max_pendientes = max(self.max_pendientes, self.pendientes)
+        futuro = self._ejecutor.submit(self._ejecutar, time.monotonic(), fn, args)
+        return await asyncio.wrap_future(futuro)
+
+    def estadisticas(self):
+        with self._lock:
+            return {
+                "trabajadores": self.trabajadores,
+                "max_en_cola": self.max_en_cola,
+                "en_cola": self.pendientes - self.en_curso,
+                "en_curso": self.en_curso,
+                "max_en_cola_observado": self.max_pendientes,
+                "completadas": self.completadas,
+                "rechazadas": self.rechazadas,
+                "espera_promedio_ms": 1000 * self.espera_total / self.completadas if self.completadas else 0.0,
+                "espera_max_ms": 1000 * self.espera_max,
+            }
+
+ejecutor_contrasenas = EjecutorContrasenas()
+
+async def hash_password(password: str) -> str:
+    return await ejecutor_contrasenas.ejecutar(pwd_context.hash, password)
+
+async def verify_password(password: str, hashed: str) -> bool:
+    return await ejecutor_contrasenas.ejecutar(pwd_context.verify, password, hashed)
+
+def necesita_rehash(hashed: str) -> bool:
+    return pwd_context.needs_update(hashed)
@@ -0,0 +1,70 @@
+from sqlalchemy import insert
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+# Qué hacer cuando ya existe un registro con la misma (date, user_id)
+CONFLICTOS = ("error", "omitir", "sobrescribir", "sumar")
+
+# Dialectos con INSERT ... ON CONFLICT
+_INSERTS_ON_CONFLICT = {
+    "sqlite": sqlite.insert,
+    "postgresql": postgresql.insert,
+}
+
+def admite_on_conflict(db) -> bool:
+    return db.get_bind().dialect.name in _INSERTS_ON_CONFLICT
+
+def _clave(model):
+    return [c.name for c in model.__table__.primary_key.columns]
+
+def sentencia_insert(db: Session, model, conflicto: str = "error"):
+    """INSERT Core para `model` que resuelve duplicados de clave primaria según `conflicto`."""
+    if conflicto not in CONFLICTOS:
+        raise ValueError(f"Conflicto '{conflicto}' no soportado. Opciones válidas: {', '.join(CONFLICTOS)}")
+    tabla = model.__table__
+    if conflicto == "error":
+        return insert(tabla)
+
+    dialecto = db.get_bind().dialect.name
+    if dialecto not in _INSERTS_ON_CONFLICT:
+        raise ValueError(f"El conflicto '{conflicto}' no está disponible para la base de datos {dialecto}")
+    stmt = _INSERTS_ON_CONFLICT[dialecto](tabla)
+    clave = _clave(model)
+    if conflicto == "omitir":
+        return stmt.on_conflict_do_nothing(index_elements=clave)
+
+    valores = [c.name for c in tabla.columns if c.name not in clave]
+    if conflicto == "sobrescribir":
+        cambios = {nombre: stmt.excluded[nombre] for nombre in valores}
+    else:
+        # sumar: acumula el monto (amount o value) y conserva el resto del registro existente
+        monto = "value" if "value" in tabla.c else "amount"
+        cambios = {monto: tabla.c[monto] + stmt.excluded[monto]}
+    return stmt.on_conflict_do_update(index_elements=clave, set_=cambios)
+
+def combinar_duplicados(model, filas, conflicto: str):
+    """
+    Resuelve en memoria las claves repetidas dentro de un mismo lote, ya que un único
+    INSERT ... ON CONFLICT no puede afectar dos veces la misma fila.
+    """
+    if conflicto == "error":
+        return filas
+    clave = _clave(model)
+    monto = "value" if "value" in model.__table__.c else "amount"
+    resultado = {}
+    for fila in filas:
+        k = tuple(fila[c] for c in clave)
+        if k not in resultado:
+            resultado[k] = dict(fila)
+        elif conflicto == "sobrescribir":
+            resultado[k] = dict(fila)
+        elif conflicto == "sumar":
+            resultado[k][monto] += fila[monto]
+    return list(resultado.values())
+
+def insertar_muchos(db: Session, model, filas, conflicto: str = "error"):
+    """Inserta `filas` (dicts por columna) con una sola ejecución tipo executemany."""
+    filas = combinar_duplicados(model, filas, conflicto)
+    if filas:
+        db.execute(sentencia_insert(db, model, conflicto), filas)
+    return len(filas)
@@ -0,0 +1,73 @@
+import csv
+import io
+import json
+import os
+from sqlalchemy import select
+from db.db import SessionLocal
+from services.importacion import TIPOS_REGISTROS, TIPOS_METAS
+
+# Filas que se leen en cada consulta y se envían en cada fragmento
+EXPORTACION_LOTE = int(os.getenv("EXPORTACION_LOTE", "1000"))
+
+TIPOS_EXPORTACION = {**TIPOS_REGISTROS, **TIPOS_METAS}
+
+def columnas_csv(tipo: str):
+    # Mismo orden y nombres que espera el importador para el tipo
+    if tipo in TIPOS_METAS:
+        return ["date", "value"]
+    if TIPOS_REGISTROS[tipo]['tiene_categoria']:
+        return ["date", "amount", "category"]
+    return ["date", "amount"]
+
+def _lotes(db, user_id: int, tipo: str):
+    # Por keyset sobre (user_id, date), como services.paginacion: cada lote es una consulta
+    # corta y acotada que se lee entera. Entre lotes no queda ninguna sentencia abierta ni
+    # transacción (en SQLite sin WAL, un cursor abierto retendría el bloqueo SHARED y un
+    # cliente lento impediría cualquier escritura durante toda la descarga).
+    modelo = TIPOS_EXPORTACION[tipo]['modelo']
+    columnas = [getattr(modelo, c) for c in columnas_csv(tipo)]
+    ultima = None
+    while True:
+        consulta = select(*columnas).where(modelo.user_id == user_id)
+        if ultima is not None:
+            consulta = consulta.where(modelo.date > ultima)
+        lote = db.execute(consulta.order_by(modelo.date).limit(EXPORTACION_LOTE)).all()
+        db.rollback()
+        if lote:
+            yield lote
+        if len(lote) < EXPORTACION_LOTE:
+            return
+        ultima = lote[-1][0]
+
+def generar_ndjson(user_id: int, tipos):
+    """Una línea JSON por registro, de todos los tipos pedidos: {"tipo": ..., "date": ..., ...}."""
+    db = SessionLocal()
+    try:
+        for tipo in tipos:
+            columnas = columnas_csv(tipo)
+            for lote in _lotes(db, user_id, tipo):
+                lineas = []
+                for fila in lote:
+                    registro = {"tipo": tipo, **dict(zip(columnas, fila))}
+                    registro["date"] = registro["date"].isoformat()
+                    lineas.append(json.dumps(registro, ensure_ascii=False))
+                yield "\n".join(lineas) + "\n"
+    finally:
+        db.close()
+
+def generar_csv(user_id: int, tipo: str):
+    """CSV de un tipo con las columnas del importador, para volver a cargarlo con /importar."""
+    db = SessionLocal()
+    try:
+        buffer = io.StringIO()
+        escritor = csv.writer(buffer, lineterminator="\n")
+        escritor.writerow(columnas_csv(tipo))
+        for lote in _lotes(db, user_id, tipo):
+            escritor.writerows((fila[0].isoformat(), *fila[1:]) for fila in lote)
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        if buffer.tell():
+            yield buffer.getvalue()
+    finally:
+        db.close()
@@ -0,0 +1,311 @@
+import csv
+import multiprocessing
+import os
+import shutil
+import tempfile
+import threading
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from sqlalchemy.orm import Session
+from models import Income, Expense, Saving, Investment, ExpenseGoal, SavingGoal, InvestmentGoal
+from services.escritura import insertar_muchos
+from services.parseo import parsear_fechas, parsear_montos, parsear_categorias
+from services.rollup import refrescar
+from services.cambios import registrar_cambio
+
+# Filas que se validan e insertan juntas; acota la memoria sin importar el tamaño del archivo
+TAMANO_LOTE = int(os.getenv("IMPORTACION_TAMANO_LOTE", "1000"))
+
+# Procesos para validar en paralelo las importaciones de varios archivos
+PROCESOS = int(os.getenv("IMPORTACION_PROCESOS", str(os.cpu_count() or 1)))
+
+# Tamaño máximo (bytes) de cada archivo descomprimido y del total copiado a disco en una
+# importación de varios archivos; los zip se comprueban antes de extraerlos
+MAX_BYTES_ARCHIVO = int(os.getenv("IMPORTACION_MAX_BYTES_ARCHIVO", str(50 * 1024 * 1024)))
+MAX_BYTES_TOTAL = int(os.getenv("IMPORTACION_MAX_BYTES_TOTAL", str(200 * 1024 * 1024)))
+
+# Mapeo de tipos de registros a sus modelos y columnas requeridas
+TIPOS_REGISTROS = {
+    'expense': {
+        'modelo': Expense,
+        'columnas': {'date', 'amount', 'category'},
+        'tiene_categoria': True
+    },
+    'income': {
+        'modelo': Income,
+        'columnas': {'date', 'amount'},
+        'tiene_categoria': False
+    },
+    'saving': {
+        'modelo': Saving,
+        'columnas': {'date', 'amount', 'category'},
+        'tiene_categoria': True
+    },
+    'investment': {
+        'modelo': Investment,
+        'columnas': {'date', 'amount', 'category'},
+        'tiene_categoria': True
+    }
+}
+
+# Mapeo de tipos de metas
+TIPOS_METAS = {
+    'expense_goal': {
+        'modelo': ExpenseGoal,
+        'columnas': {'date', 'value'},
+        'tiene_categoria': False
+    },
+    'saving_goal': {
+        'modelo': SavingGoal,
+        'columnas': {'date', 'value'},
+        'tiene_categoria': False
+    },
+    'investment_goal': {
+        'modelo': InvestmentGoal,
+        'columnas': {'date', 'value'},
+        'tiene_categoria': False
+    }
+}
+
+class ColumnasFaltantes(Exception):
+    def __init__(self, columnas):
+        super().__init__(f"El archivo CSV debe contener las columnas: {', '.join(columnas)}")
+        self.columnas = columnas
+
+class ErroresCSV(Exception):
+    def __init__(self, errores):
+        super().__init__("Errores en el CSV")
+        self.errores = errores
+
+class ArchivoInvalido(Exception):
+    pass
+
+def validar_lote(filas, tipo, errores):
+    """Valida un lote de (línea, fila) y devuelve los registros válidos; acumula errores por línea."""
+    config = TIPOS_REGISTROS.get(tipo) or TIPOS_METAS.get(tipo)
+    campo_monto = 'value' if tipo in TIPOS_METAS else 'amount'
+    filas = list(filas)
+
+    # Se convierte cada columna completa de una vez en lugar de fila por fila
+    fechas = parsear_fechas([row['date'] for _, row in filas])
+    montos = parsear_montos([row[campo_monto] for _, row in filas])
+    if config['tiene_categoria']:
+        categorias = parsear_categorias([row['category'] for _, row in filas])
+    else:
+        categorias = [None] * len(filas)
+
+    registros = []
+    for (idx, _), fecha, monto, categoria in zip(filas, fechas, montos, categorias):
+        if not fecha:
+            errores.append(f"Línea {idx}: Fecha inválida (formato YYYY-MM-DD)")
+        elif monto is None:
+            errores.append(f"Línea {idx}: Monto inválido")
+        elif config['tiene_categoria'] and not categoria:
+            errores.append(f"Línea {idx}: Categoría inválida")
+        else:
+            registros.append({
+                'fecha': fecha,
+                'monto': monto,
+                'categoria': categoria
+            })
+    return registros
+
+def insertar_lote(db: Session, registros, tipo, user_id, conflicto="error"):
+    config = TIPOS_REGISTROS.get(tipo) or TIPOS_METAS.get(tipo)
+    if tipo in TIPOS_METAS:
+        filas = [
+            {'user_id': user_id, 'date': registro['fecha'], 'value': registro['monto']}
+            for registro in registros
+        ]
+    else:
+        filas = [
+            {
+                'user_id': user_id,
+                'date': registro['fecha'],
+                'amount': registro['monto'],
+                'category': registro['categoria'] if config['tiene_categoria'] else None
+            }
+            for registro in registros
+        ]
+    return insertar_muchos(db, config['modelo'], filas, conflicto)
+
+def importar_stream(
+    db: Session,
+    texto,
+    tipo: str,
+    user_id: int,
+    conflicto: str = "error",
+    tamano_lote: int = TAMANO_LOTE,
+    progreso=None,
+):
+    """
+    Importa un CSV leído de forma incremental desde `texto` (stream de texto).
+
+    Valida e inserta en lotes de `tamano_lote` filas dentro de la transacción de `db`,
+    resolviendo las fechas ya existentes según `conflicto` (ver services.escritura).
+    Si alguna línea es inválida se siguen validando las demás para reportarlas todas y
+    se lanza ErroresCSV; quien llama debe hacer rollback. No hace commit.
+
+    `progreso`, si se indica, se llama tras cada lote con (leidas, importadas, rechazadas).
+    """
+    config = TIPOS_REGISTROS.get(tipo) or TIPOS_METAS.get(tipo)
+    reader = csv.DictReader(texto)
+
+    # Validar columnas requeridas
+    if not config['columnas'].issubset(reader.fieldnames or []):
+        raise ColumnasFaltantes(config['columnas'])
+
+    # Bloquea al usuario antes de la primera escritura (ver services.cambios)
+    registrar_cambio(db, user_id)
+    errores = []
+    meses = set()
+    importados = 0
+    filas = enumerate(reader, 1)
+    # Los lotes se escriben con INSERT Core (insertar_muchos): no crean objetos en la sesión,
+    # así que no hace falta flush ni expunge entre lotes para mantener la memoria constante
+    while lote := list(islice(filas, tamano_lote)):
+        registros = validar_lote(lote, tipo, errores)
+        if not errores:
+            importados += insertar_lote(db, registros, tipo, user_id, conflicto)
+            meses.update(registro['fecha'].replace(day=1) for registro in registros)
+        # Con errores la importación se descartará; solo se sigue validando
+        if progreso:
+            progreso(lote[-1][0], importados, len(errores))
+
+    if errores:
+        raise ErroresCSV(errores)
+
+    refrescar(db, user_id, tipo, meses)
+    return importados
+
+# IMPORTACIÓN DE VARIOS ARCHIVOS
+_procesos = None
+_procesos_lock = threading.Lock()
+
+def _pool():
+    # Se crea desde hilos del threadpool: el lock evita que dos peticiones creen cada una el suyo.
+    # forkserver en lugar de fork: el proceso de uvicorn tiene hilos (threadpool, pool de
+    # bcrypt, importaciones en segundo plano) y un fork podría heredar un lock tomado.
+    global _procesos
+    with _procesos_lock:
+        if _procesos is None:
+            _procesos = ProcessPoolExecutor(
+                max_workers=PROCESOS, mp_context=multiprocessing.get_context("forkserver")
+            )
+    return _procesos
+
+def cerrar_pool():
+    global _procesos
+    with _procesos_lock:
+        if _procesos is not None:
+            _procesos.shutdown()
+            _procesos = None
+
+def _tipo_de(nombre: str):
+    # El tipo se toma del nombre del archivo: expense.csv, saving_goal.csv, ...
+    tipo = os.path.splitext(os.path.basename(nombre))[0]
+    if tipo not in {**TIPOS_REGISTROS, **TIPOS_METAS}:
+        raise ArchivoInvalido(
+            f"No se reconoce el tipo del archivo '{nombre}'. El nombre debe ser uno de: "
+            f"{', '.join(f'{t}.csv' for t in {**TIPOS_REGISTROS, **TIPOS_METAS})}"
+        )
+    return tipo
+
+def _a_disco(origen, nombre: str, limite: int):
+    # Copia por bloques sin pasar de `limite` bytes: el tamaño declarado en el zip puede mentir
+    with tempfile.NamedTemporaryFile(delete=False, suffix=".csv") as tmp:
+        try:
+            copiados = 0
+            while bloque := origen.read(1024 * 1024):
+                copiados += len(bloque)
+                if copiados > limite:
+                    raise ArchivoInvalido(f"El archivo '{nombre}' supera el tamaño máximo permitido")
+                tmp.write(bloque)
+        except Exception:
+            tmp.close()
+            os.remove(tmp.name)
+            raise
+    return tmp.name, copiados
+
+def extraer_archivos(subidos):
+    """
+    Copia a disco los archivos subidos [(nombre, archivo)], expandiendo los .zip, y
+    devuelve {tipo: ruta}. Cada tipo puede aparecer una sola vez. Cada archivo queda
+    limitado a MAX_BYTES_ARCHIVO y el conjunto a MAX_BYTES_TOTAL.
+    """
+    rutas = {}
+    total = 0
+
+    def agregar(nombre, origen):
+        nonlocal total
+        tipo = _tipo_de(nombre)
+        if tipo in rutas:
+            raise ArchivoInvalido(f"El tipo '{tipo}' aparece en más de un archivo")
+        limite = min(MAX_BYTES_ARCHIVO, MAX_BYTES_TOTAL - total)
+        rutas[tipo], copiados = _a_disco(origen, nombre, limite)
+        total += copiados
+
+    try:
+        for nombre, archivo in subidos:
+            if nombre.lower().endswith(".zip"):
+                try:
+                    with zipfile.ZipFile(archivo) as comprimido:
+                        entradas = [e for e in comprimido.infolist() if not e.is_dir()]
+                        for entrada in entradas:
+                            if entrada.file_size > MAX_BYTES_ARCHIVO:
+                                raise ArchivoInvalido(
+                                    f"El archivo '{entrada.filename}' supera el tamaño máximo permitido"
+                                )
+                        if total + sum(e.file_size for e in entradas) > MAX_BYTES_TOTAL:
+                            raise ArchivoInvalido(f"El contenido de '{nombre}' supera el tamaño máximo permitido")
+                        for entrada in entradas:
+                            with comprimido.open(entrada) as origen:
+                                agregar(entrada.filename, origen)
+                except zipfile.BadZipFile:
+                    raise ArchivoInvalido(f"El archivo '{nombre}' no es un zip válido")
+            else:
+                agregar(nombre, archivo)
+    except Exception:
+        eliminar_archivos(rutas)
+        raise
+    return rutas
+
+def eliminar_archivos(rutas):
+    for ruta in rutas.values():
+        if os.path.exists(ruta):
+            os.remove(ruta)
+
+def validar_archivo(ruta: str, tipo: str):
+    """Lee y valida un CSV completo; se ejecuta en un proceso del pool. Devuelve (registros, errores)."""
+    config = TIPOS_REGISTROS.get(tipo) or TIPOS_METAS.get(tipo)
+    with open(ruta, encoding="utf-8", newline="") as texto:
+        reader = csv.DictReader(texto)
+        if not config['columnas'].issubset(reader.fieldnames or []):
+            return [], [str(ColumnasFaltantes(config['columnas']))]
+        errores = []
+        registros = validar_lote(enumerate(reader, 1), tipo, errores)
+    return registros, errores
+
+def importar_varios(db: Session, rutas, user_id: int, conflicto: str = "error", tamano_lote: int = TAMANO_LOTE):
+    """
+    Valida en paralelo (un proceso por archivo) e inserta todos los tipos en la
+    transacción de `db`. Si algún archivo tiene errores no se inserta nada y se lanza
+    ErroresCSV con los errores agrupados por tipo. No hace commit.
+    """
+    futuros = {tipo: _pool().submit(validar_archivo, ruta, tipo) for tipo, ruta in rutas.items()}
+    resultados = {tipo: futuro.result() for tipo, futuro in futuros.items()}
+
+    errores = {tipo: errs for tipo, (_, errs) in resultados.items() if errs}
+    if errores:
+        raise ErroresCSV(errores)
+
+    # Bloquea al usuario antes de la primera escritura (ver services.cambios)
+    registrar_cambio(db, user_id)
+    importados = {}
+    for tipo, (registros, _) in resultados.items():
+        importados[tipo] = 0
+        for inicio in range(0, len(registros), tamano_lote):
+            importados[tipo] += insertar_lote(db, registros[inicio:inicio + tamano_lote], tipo, user_id, conflicto)
+        refrescar(db, user_id, tipo, {registro['fecha'].replace(day=1) for registro in registros})
+    return importados
@@ -0,0 +1,99 @@
+import os
+from collections import defaultdict
+from sqlalchemy import update, delete
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from services.importacion import TIPOS_REGISTROS
+from services.repositorio import crear_registro, fila_a_dict, RegistroExistente
+from services.escritura import admite_on_conflict
+from services.rollup import refrescar
+from services.cambios import registrar_cambio
+
+# Máximo de operaciones por petición de lote
+LOTE_MAX_OPERACIONES = int(os.getenv("LOTE_MAX_OPERACIONES", "500"))
+
+class OperacionInvalida(Exception):
+    pass
+
+def _validar(op, categorias):
+    permitidas = categorias.get(op.tipo)
+    if op.category is not None:
+        if permitidas is None:
+            raise OperacionInvalida(f"El tipo '{op.tipo}' no admite categoría")
+        if op.category not in permitidas:
+            raise OperacionInvalida(f"Categoría '{op.category}' no válida para '{op.tipo}'")
+    if op.op == "crear":
+        if op.amount is None:
+            raise OperacionInvalida("El monto es obligatorio para crear")
+        if permitidas is not None and op.category is None:
+            raise OperacionInvalida("La categoría es obligatoria para crear")
+    elif op.op == "actualizar" and op.amount is None and op.category is None:
+        raise OperacionInvalida("No hay cambios que aplicar")
+
+def _clave(model, user_id, op):
+    return (model.user_id == user_id, model.date == op.date)
+
+def _crear(db: Session, model, user_id: int, op):
+    valores = {"user_id": user_id, "date": op.date, "amount": op.amount}
+    if "category" in model.__table__.c:
+        valores["category"] = op.category
+    on_conflict = admite_on_conflict(db)
+    if op.upsert and not on_conflict:
+        raise OperacionInvalida("El upsert no está disponible para esta base de datos")
+    try:
+        if on_conflict:
+            return crear_registro(db, model, valores, "sobrescribir" if op.upsert else "error")
+        # Sin ON CONFLICT el duplicado lanza IntegrityError: el savepoint evita que aborte el lote
+        with db.begin_nested():
+            return crear_registro(db, model, valores)
+    except (RegistroExistente, IntegrityError):
+        raise OperacionInvalida("Ya existe un registro para esta fecha")
+
+def _actualizar(db: Session, model, user_id: int, op):
+    cambios = {"amount": op.amount, "category": op.category}
+    cambios = {k: v for k, v in cambios.items() if v is not None}
+    fila = db.execute(
+        update(model.__table__).where(*_clave(model, user_id, op)).values(**cambios)
+        .returning(*model.__table__.c)
+    ).first()
+    if fila is None:
+        raise OperacionInvalida("Registro no encontrado")
+    return fila_a_dict(model, fila)
+
+def _eliminar(db: Session, model, user_id: int, op):
+    fila = db.execute(
+        delete(model.__table__).where(*_clave(model, user_id, op)).returning(model.__table__.c.date)
+    ).first()
+    if fila is None:
+        raise OperacionInvalida("Registro no encontrado")
+    return None
+
+ACCIONES = {"crear": _crear, "actualizar": _actualizar, "eliminar": _eliminar}
+
+def aplicar_lote(db: Session, user_id: int, operaciones, categorias):
+    """
+    Aplica en orden operaciones de alta/modificación/baja sobre varios tipos en la
+    transacción de `db`, sin hacer commit. Cada sentencia informa su propio resultado
+    (ON CONFLICT DO NOTHING / UPDATE / DELETE con RETURNING), así que una operación
+    fallida no aborta la transacción; solo las altas en bases sin ON CONFLICT usan savepoint.
+    `categorias` es {tipo: categorías válidas} para los tipos que llevan categoría.
+    """
+    # Bloquea al usuario antes de la primera escritura (ver services.cambios)
+    registrar_cambio(db, user_id)
+    resultados = []
+    fechas = defaultdict(set)
+    for indice, op in enumerate(operaciones):
+        model = TIPOS_REGISTROS[op.tipo]['modelo']
+        try:
+            _validar(op, categorias)
+            data = ACCIONES[op.op](db, model, user_id, op)
+        except OperacionInvalida as e:
+            resultados.append({"indice": indice, "ok": False, "error": str(e)})
+            continue
+        fechas[op.tipo].add(op.date)
+        resultados.append({"indice": indice, "ok": True, "data": data})
+
+    # Un refresco del rollup por tipo con todas las fechas tocadas
+    for tipo, fechas_tipo in fechas.items():
+        refrescar(db, user_id, tipo, fechas_tipo)
+    return resultados
@@ -0,0 +1,47 @@
+import os
+from datetime import date
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+# Tamaño de página de los listados por usuario
+PAGINA_DEFECTO = int(os.getenv("LISTADOS_PAGINA", "100"))
+PAGINA_MAX = int(os.getenv("LISTADOS_PAGINA_MAX", "1000"))
+
+# Cabecera con el cursor de la página siguiente (ausente en la última página)
+CABECERA_CURSOR = "X-Next-Cursor"
+
+async def listar_pagina(
+    db: AsyncSession,
+    model,
+    user_id: int,
+    limite: int,
+    cursor: date | None = None,
+    desde: date | None = None,
+    hasta: date | None = None,
+    categoria: str | None = None,
+    columnas=None,
+):
+    """
+    Página de registros de un usuario ordenados por fecha, por keyset sobre (user_id, date):
+    cada página empieza después de la última fecha de la anterior, así que el coste no
+    depende de cuántas páginas se hayan recorrido. Devuelve (filas, cursor_siguiente).
+    Con `columnas` se leen solo esas columnas como tuplas, sin construir objetos del ORM.
+    """
+    filtros = [model.user_id == user_id]
+    if cursor is not None:
+        filtros.append(model.date > cursor)
+    if desde is not None:
+        filtros.append(model.date >= desde)
+    if hasta is not None:
+        filtros.append(model.date <= hasta)
+    if categoria is not None:
+        filtros.append(model.category == categoria)
+
+    consulta = select(*[getattr(model, c) for c in columnas]) if columnas else select(model)
+    resultado = await db.execute(consulta.where(*filtros).order_by(model.date).limit(limite + 1))
+    filas = resultado.all() if columnas else resultado.scalars().all()
+
+    if len(filas) > limite:
+        filas = filas[:limite]
+        return filas, filas[-1].date.isoformat()
+    return filas, None
@@ -0,0 +1,39 @@
+from datetime import date, datetime
+
+# Parseo por columnas para la importación: recibe todos los valores de una columna
+# de un lote y devuelve una lista paralela con el valor convertido o None si es inválido.
+
+def parsear_fechas(valores):
+    """Convierte fechas 'YYYY-MM-DD'. Mismo resultado que validar_fecha (benchmarks/bench_importacion_parseo.py), pero más rápido."""
+    fromisoformat = date.fromisoformat
+    strptime = datetime.strptime
+    fechas = []
+    for valor in valores:
+        try:
+            # Camino rápido: formato fijo de 10 caracteres
+            if len(valor) == 10 and valor[4] == '-' and valor[7] == '-':
+                try:
+                    fechas.append(fromisoformat(valor))
+                    continue
+                except ValueError:
+                    pass
+            # strptime acepta variantes sin ceros a la izquierda (2024-1-5)
+            fechas.append(strptime(valor, "%Y-%m-%d").date())
+        except (ValueError, TypeError):
+            fechas.append(None)
+    return fechas
+
+def parsear_montos(valores):
+    """Convierte montos no negativos admitiendo coma decimal. Mismo resultado que validar_monto (ver el benchmark)."""
+    montos = []
+    for valor in valores:
+        try:
+            # float() ya ignora espacios al inicio y al final
+            monto = float(valor.replace(',', '.') if ',' in valor else valor)
+            montos.append(monto if monto >= 0 else None)
+        except (ValueError, TypeError):
+            montos.append(None)
+    return montos
+
+def parsear_categorias(valores):
+    return [valor.strip() if valor else None for valor in valores]
@@ -0,0 +1,48 @@
+from sqlalchemy import Float
+from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from services.escritura import sentencia_insert, admite_on_conflict
+from services.cambios import registrar_cambio, registrar_cambio_async
+
+# Alta de un registro (user_id, date) en una sola sentencia:
+# INSERT ... ON CONFLICT ... RETURNING, sin SELECT previo ni refresh posterior.
+
+class RegistroExistente(Exception):
+    pass
+
+def sentencia_crear(db, model, valores: dict, conflicto: str = "error"):
+    if conflicto == "error" and admite_on_conflict(db):
+        # El duplicado no lanza IntegrityError: DO NOTHING no devuelve fila
+        stmt = sentencia_insert(db, model, "omitir")
+    else:
+        stmt = sentencia_insert(db, model, conflicto)
+    return stmt.values(**valores).returning(*model.__table__.c)
+
+def fila_a_dict(model, fila):
+    # SQLite devuelve como int los REAL enteros en RETURNING con ON CONFLICT
+    return {
+        columna.name: float(valor) if isinstance(columna.type, Float) and valor is not None else valor
+        for columna, valor in zip(model.__table__.c, fila)
+    }
+
+def _resultado(model, fila, conflicto: str):
+    if fila is None:
+        if conflicto == "error":
+            raise RegistroExistente()
+        return None  # omitir: ya existía y no se escribió nada
+    return fila_a_dict(model, fila)
+
+def crear_registro(db: Session, model, valores: dict, conflicto: str = "error"):
+    """
+    Inserta `valores` y devuelve la fila escrita como dict. Con conflicto "error" lanza
+    RegistroExistente si la clave ya existe; "sobrescribir" y "sumar" hacen upsert.
+    Bloquea al usuario antes de escribir, en el mismo orden que lotes e importaciones.
+    """
+    registrar_cambio(db, valores["user_id"])
+    fila = db.execute(sentencia_crear(db, model, valores, conflicto)).first()
+    return _resultado(model, fila, conflicto)
+
+async def crear_registro_async(db: AsyncSession, model, valores: dict, conflicto: str = "error"):
+    await registrar_cambio_async(db, valores["user_id"])
+    fila = (await db.execute(sentencia_crear(db, model, valores, conflicto))).first()
+    return _resultado(model, fila, conflicto)
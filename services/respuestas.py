@@ -0,0 +1,35 @@
+import json
+import os
+from datetime import date
+from fastapi import Response
+
+try:
+    import orjson
+except ImportError:  # sin orjson se usa json de la biblioteca estándar
+    orjson = None
+
+# Modo rápido opcional para listados e histórico: los datos internos (filas de la base y
+# series del rollup) se serializan directamente a bytes, sin validarlos elemento a elemento
+# con el response_model ni pasarlos por jsonable_encoder
+RESPUESTAS_RAPIDAS = os.getenv("RESPUESTAS_RAPIDAS", "false").lower() == "true"
+
+def _por_defecto(valor):
+    if isinstance(valor, date):
+        return valor.isoformat()
+    raise TypeError(f"Tipo no serializable: {type(valor).__name__}")
+
+def a_json(contenido) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(contenido)
+    return json.dumps(
+        contenido, ensure_ascii=False, separators=(",", ":"), default=_por_defecto
+    ).encode("utf-8")
+
+def filas_a_dicts(columnas, filas):
+    return [dict(zip(columnas, fila)) for fila in filas]
+
+class RespuestaRapida(Response):
+    media_type = "application/json"
+
+    def render(self, content) -> bytes:
+        return a_json(content)
@@ -0,0 +1,169 @@
+import argparse
+from datetime import date
+from sqlalchemy import select, insert, delete, func, extract, cast, literal, union_all, Integer
+from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from services.cambios import registrar_cambio, registrar_cambio_async
+from models import (
+    Income, Expense, Saving, Investment,
+    ExpenseGoal, SavingGoal, InvestmentGoal, MonthlyRollup
+)
+
+# Tipos acumulados en monthly_rollups: modelo y columna que se agrega
+TIPOS_ROLLUP = {
+    'income': (Income, 'amount'),
+    'expense': (Expense, 'amount'),
+    'saving': (Saving, 'amount'),
+    'investment': (Investment, 'amount'),
+    'expense_goal': (ExpenseGoal, 'value'),
+    'saving_goal': (SavingGoal, 'value'),
+    'investment_goal': (InvestmentGoal, 'value'),
+}
+
+def periodo_expr(columna):
+    # Periodo como entero YYYYMM calculado en SQL (portable entre SQLite y Postgres)
+    return cast(extract("year", columna) * 100 + extract("month", columna), Integer)
+
+def periodo_de(fecha: date) -> int:
+    return fecha.year * 100 + fecha.month
+
+def _inicio_periodo(periodo: int) -> date:
+    return date(periodo // 100, periodo % 100, 1)
+
+def _fin_periodo(periodo: int) -> date:
+    # Primer día del mes siguiente (límite exclusivo)
+    year, month = divmod(periodo, 100)
+    return date(year + month // 12, month % 12 + 1, 1)
+
+def _origen(tipo: str, filtros, periodo_filtros=()):
+    # SELECT user_id, kind, period, total desde la tabla base del tipo
+    model, campo = TIPOS_ROLLUP[tipo]
+    periodo = periodo_expr(model.date)
+    if campo == 'value':
+        # Metas: vale la última registrada en el mes
+        ultima = select(model.user_id, func.max(model.date).label("date")).where(
+            *filtros, *[f(periodo) for f in periodo_filtros]
+        ).group_by(model.user_id, periodo).subquery()
+        return select(
+            model.user_id, literal(tipo), periodo, model.value
+        ).join(ultima, (model.user_id == ultima.c.user_id) & (model.date == ultima.c.date))
+    return select(
+        model.user_id, literal(tipo), periodo, func.sum(model.amount)
+    ).where(*filtros, *[f(periodo) for f in periodo_filtros]).group_by(model.user_id, periodo)
+
+def totales_rango(user_id: int, tipos, tramos):
+    """
+    SELECT user_id, kind, period, total de las filas de un usuario con fecha dentro de alguno de los
+    `tramos` (desde, hasta) inclusivos, calculado sobre las tablas base. Sirve para los meses
+    que un rango de fechas cubre solo en parte y que por tanto no salen del rollup.
+    """
+    consultas = []
+    for desde, hasta in tramos:
+        for tipo in tipos:
+            model, _ = TIPOS_ROLLUP[tipo]
+            filtros = [model.user_id == user_id, model.date >= desde, model.date <= hasta]
+            consultas.append(_origen(tipo, filtros))
+    return union_all(*consultas) if len(consultas) > 1 else consultas[0]
+
+def sentencias_refresco(user_id: int, tipo: str, fechas):
+    """Sentencias que recalculan los meses tocados por `fechas` para un usuario y tipo."""
+    periodos = sorted({periodo_de(f) for f in fechas})
+    if not periodos:
+        return []
+    model, _ = TIPOS_ROLLUP[tipo]
+    filtros = [
+        model.user_id == user_id,
+        model.date >= _inicio_periodo(periodos[0]),
+        model.date < _fin_periodo(periodos[-1]),
+    ]
+    return [
+        delete(MonthlyRollup).where(
+            MonthlyRollup.user_id == user_id,
+            MonthlyRollup.kind == tipo,
+            MonthlyRollup.period.in_(periodos),
+        ),
+        insert(MonthlyRollup).from_select(
+            ["user_id", "kind", "period", "total"],
+            _origen(tipo, filtros, [lambda p: p.in_(periodos)]),
+        ),
+    ]
+
+def refrescar(db: Session, user_id: int, tipo: str, fechas):
+    """Actualiza el rollup de los meses modificados. Debe llamarse antes del commit."""
+    db.flush()
+    registrar_cambio(db, user_id)
+    for sentencia in sentencias_refresco(user_id, tipo, fechas):
+        db.execute(sentencia)
+
+async def refrescar_async(db: AsyncSession, user_id: int, tipo: str, fechas):
+    """Igual que refrescar, para sesiones asíncronas."""
+    await db.flush()
+    await registrar_cambio_async(db, user_id)
+    for sentencia in sentencias_refresco(user_id, tipo, fechas):
+        await db.execute(sentencia)
+
+def reconstruir(db: Session, user_id: int | None = None, marcar: bool = True):
+    """
+    Recalcula el rollup completo (o el de un usuario) desde las tablas base.
+    Con marcar=False no registra el cambio (ni toca users.data_version): lo usan las
+    migraciones, que pueden correr antes de que exista esa columna.
+    """
+    borrar = delete(MonthlyRollup)
+    if marcar:
+        registrar_cambio(db, user_id)
+    if user_id is not None:
+        borrar = borrar.where(MonthlyRollup.user_id == user_id)
+    db.execute(borrar)
+    for tipo, (model, _) in TIPOS_ROLLUP.items():
+        filtros = [model.user_id == user_id] if user_id is not None else []
+        db.execute(insert(MonthlyRollup).from_select(
+            ["user_id", "kind", "period", "total"], _origen(tipo, filtros)
+        ))
+
+def verificar(db: Session, tolerancia: float = 1e-6):
+    """Compara el rollup con las tablas base y devuelve las diferencias encontradas."""
+    esperado = {}
+    for tipo, (model, _) in TIPOS_ROLLUP.items():
+        for user_id, kind, period, total in db.execute(_origen(tipo, [])):
+            esperado[(user_id, kind, period)] = total
+    actual = {
+        (r.user_id, r.kind, r.period): r.total
+        for r in db.execute(select(MonthlyRollup)).scalars()
+    }
+    diferencias = []
+    for clave in sorted(esperado.keys() | actual.keys()):
+        esperado_total, actual_total = esperado.get(clave), actual.get(clave)
+        if esperado_total is None or actual_total is None or abs(esperado_total - actual_total) > tolerancia:
+            diferencias.append({
+                "user_id": clave[0],
+                "kind": clave[1],
+                "period": clave[2],
+                "esperado": esperado_total,
+                "actual": actual_total,
+            })
+    return diferencias
+
+if __name__ == "__main__":
+    from db.db import SessionLocal, engine
+
+    MonthlyRollup.__table__.create(bind=engine, checkfirst=True)
+
+    parser = argparse.ArgumentParser(description="Mantenimiento de la tabla monthly_rollups")
+    parser.add_argument("accion", choices=["reconstruir", "verificar"])
+    parser.add_argument("--user-id", type=int, default=None)
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        if args.accion == "reconstruir":
+            reconstruir(db, args.user_id)
+            db.commit()
+            print("Rollup mensual reconstruido correctamente.")
+        else:
+            diferencias = verificar(db)
+            for d in diferencias:
+                print(d)
+            print(f"{len(diferencias)} diferencias encontradas.")
+            raise SystemExit(1 if diferencias else 0)
+    finally:
+        db.close()
@@ -0,0 +1,246 @@
+import json
+import logging
+import os
+import shutil
+import socket
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+from db.db import SessionLocal
+from models import ImportJob
+from services.importacion import importar_stream, ErroresCSV
+
+logger = logging.getLogger(__name__)
+
+# Hilos dedicados a importaciones en segundo plano (no ocupan los workers de peticiones)
+TRABAJADORES = int(os.getenv("IMPORTACION_TRABAJADORES", "2"))
+
+# Cada LATIDO segundos el proceso publica en import_jobs el avance y el latido de sus
+# trabajos y da por perdidos los de procesos que ya no existen. Un trabajo de otra máquina
+# sin latido durante LATIDO_CADUCA segundos también se da por perdido.
+LATIDO = float(os.getenv("IMPORTACION_LATIDO", "10"))
+LATIDO_CADUCA = float(os.getenv("IMPORTACION_LATIDO_CADUCA", "120"))
+
+ESTADOS_EN_CURSO = ("pendiente", "procesando")
+
+_ejecutor = ThreadPoolExecutor(max_workers=TRABAJADORES, thread_name_prefix="importacion")
+
+# Contadores de los trabajos que ejecuta este proceso, de donde el latido copia el avance
+# a import_jobs. La importación es una sola transacción que en SQLite retiene el bloqueo de
+# escritura, así que allí la tabla solo se actualiza entre importaciones; el proceso
+# propietario completa la respuesta con estos contadores.
+_progreso = {}
+_lock = threading.Lock()
+
+def _inicio_proceso(pid: int):
+    # Arranque del proceso en ticks desde el inicio del sistema (Linux): distingue un pid
+    # reutilizado del proceso original
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            return f.read().rsplit(")", 1)[1].split()[19]
+    except (OSError, IndexError):
+        return None
+
+def propietario() -> str:
+    """Identificador "host:pid:arranque" del proceso actual (se calcula por pid: vale tras un fork)."""
+    pid = os.getpid()
+    return f"{socket.gethostname()}:{pid}:{_inicio_proceso(pid) or '-'}"
+
+def _propietario_vivo(valor, latido, limite: datetime) -> bool:
+    if not valor:
+        # Trabajos anteriores a la columna: solo cuenta su última actualización
+        return latido is not None and latido >= limite
+    host, pid, arranque = valor.rsplit(":", 2)
+    if host == socket.gethostname() and arranque != "-":
+        try:
+            os.kill(int(pid), 0)
+        except ProcessLookupError:
+            return False
+        except PermissionError:
+            pass
+        return _inicio_proceso(int(pid)) == arranque
+    return latido is not None and latido >= limite
+
+def crear_trabajo(db: Session, archivo, tipo: str, user_id: int, conflicto: str = "error") -> ImportJob:
+    """Copia el archivo subido a disco, registra el trabajo y lo encola en el pool."""
+    with tempfile.NamedTemporaryFile(delete=False, suffix=".csv") as tmp:
+        shutil.copyfileobj(archivo, tmp)
+
+    job = ImportJob(
+        user_id=user_id, tipo=tipo, conflicto=conflicto, estado="pendiente",
+        propietario=propietario(), latido=datetime.utcnow(),
+    )
+    db.add(job)
+    db.commit()
+    db.refresh(job)
+
+    _ejecutor.submit(_ejecutar, job.id, tmp.name).add_done_callback(_informar_fallo)
+    return job
+
+def _informar_fallo(futuro):
+    # _ejecutar registra sus propios errores en el trabajo; esto solo salta si ni eso pudo hacerse
+    error = futuro.exception()
+    if error is not None:
+        logger.error("Error no controlado en una importación en segundo plano", exc_info=error)
+
+def _finalizar(job_id: int, progreso, errores):
+    # Sesión nueva: la del trabajo puede haber quedado inservible tras el fallo
+    db = SessionLocal()
+    try:
+        job = db.get(ImportJob, job_id)
+        if job is None:
+            return
+        job.filas_leidas = progreso["filas_leidas"]
+        job.filas_rechazadas = progreso["filas_rechazadas"]
+        if errores is None:
+            job.estado = "completado"
+            job.filas_importadas = progreso["filas_importadas"]
+        else:
+            job.estado = "error"
+            job.filas_importadas = 0
+            job.errores = json.dumps(errores, ensure_ascii=False)
+        db.commit()
+    finally:
+        db.close()
+
+def _ejecutar(job_id: int, ruta: str):
+    db = SessionLocal()
+    progreso = {"filas_leidas": 0, "filas_importadas": 0, "filas_rechazadas": 0}
+    errores = None
+    try:
+        job = db.get(ImportJob, job_id)
+        if job is None:
+            raise LookupError(f"El trabajo de importación {job_id} no existe")
+        job.estado = "procesando"
+        job.propietario = propietario()
+        job.latido = datetime.utcnow()
+        db.commit()
+        tipo, user_id, conflicto = job.tipo, job.user_id, job.conflicto
+
+        with _lock:
+            _progreso[job_id] = progreso
+
+        def actualizar(leidas, importadas, rechazadas):
+            progreso.update(filas_leidas=leidas, filas_importadas=importadas, filas_rechazadas=rechazadas)
+
+        with open(ruta, encoding="utf-8", newline="") as texto:
+            importar_stream(db, texto, tipo, user_id, conflicto, progreso=actualizar)
+        db.commit()
+    except ErroresCSV as e:
+        db.rollback()
+        errores = e.errores
+    except Exception as e:
+        # Cualquier fallo, también antes de empezar a importar, deja el trabajo en error
+        db.rollback()
+        errores = [str(e)]
+    finally:
+        with _lock:
+            _progreso.pop(job_id, None)
+        if os.path.exists(ruta):
+            os.remove(ruta)
+        db.close()
+    _finalizar(job_id, progreso, errores)
+
+def expirar_huerfanos(db: Session) -> int:
+    """
+    Pasa a error los trabajos pendientes o en proceso cuyo propietario ya no existe (su
+    archivo temporal se perdió con él). En la misma máquina se comprueba el proceso; los de
+    otras máquinas caducan si dejan de latir. No toca los de otros workers vivos.
+    """
+    limite = datetime.utcnow() - timedelta(seconds=LATIDO_CADUCA)
+    en_curso = db.execute(
+        select(ImportJob.id, ImportJob.propietario, ImportJob.latido, ImportJob.actualizado)
+        .where(ImportJob.estado.in_(ESTADOS_EN_CURSO))
+    ).all()
+    huerfanos = [
+        job_id for job_id, valor, latido, actualizado in en_curso
+        if not _propietario_vivo(valor, latido or actualizado, limite)
+    ]
+    if not huerfanos:
+        return 0
+    n = db.execute(
+        update(ImportJob)
+        .where(ImportJob.id.in_(huerfanos), ImportJob.estado.in_(ESTADOS_EN_CURSO))
+        .values(
+            estado="error",
+            filas_importadas=0,
+            errores=json.dumps(["La importación se interrumpió: el proceso que la ejecutaba terminó"], ensure_ascii=False),
+            actualizado=datetime.utcnow(),
+        )
+    ).rowcount
+    db.commit()
+    return n
+
+def latir(db: Session):
+    """Publica el latido y el avance de los trabajos de este proceso y expira los huérfanos."""
+    ahora = datetime.utcnow()
+    with _lock:
+        en_curso = {job_id: dict(progreso) for job_id, progreso in _progreso.items()}
+    db.execute(
+        update(ImportJob)
+        .where(ImportJob.propietario == propietario(), ImportJob.estado.in_(ESTADOS_EN_CURSO))
+        .values(latido=ahora)
+    )
+    for job_id, progreso in en_curso.items():
+        db.execute(
+            update(ImportJob)
+            .where(ImportJob.id == job_id, ImportJob.estado == "procesando")
+            .values(**progreso)
+        )
+    db.commit()
+    return expirar_huerfanos(db)
+
+_parar_latido = threading.Event()
+
+def _bucle_latido():
+    while not _parar_latido.wait(LATIDO):
+        db = SessionLocal()
+        try:
+            latir(db)
+        except Exception:
+            # En SQLite falla mientras otra transacción escribe; se reintenta en el siguiente latido
+            db.rollback()
+            logger.debug("No se pudo publicar el latido de las importaciones", exc_info=True)
+        finally:
+            db.close()
+
+def iniciar_latido() -> int:
+    """Expira los trabajos huérfanos y arranca el hilo de latido. Devuelve los expirados."""
+    db = SessionLocal()
+    try:
+        expirados = expirar_huerfanos(db)
+    finally:
+        db.close()
+    _parar_latido.clear()
+    threading.Thread(target=_bucle_latido, name="latido-importaciones", daemon=True).start()
+    return expirados
+
+def detener_latido():
+    _parar_latido.set()
+
+def estado_trabajo(db: Session, job_id: int):
+    job = db.get(ImportJob, job_id)
+    if not job:
+        return None
+    estado = {
+        "job_id": job.id,
+        "user_id": job.user_id,
+        "tipo": job.tipo,
+        "conflicto": job.conflicto,
+        "estado": job.estado,
+        "filas_leidas": job.filas_leidas,
+        "filas_importadas": job.filas_importadas,
+        "filas_rechazadas": job.filas_rechazadas,
+        "errores": json.loads(job.errores) if job.errores else [],
+        "creado": job.creado,
+        "actualizado": job.actualizado,
+    }
+    # Si lo ejecuta este proceso, su avance en memoria es más reciente que el publicado
+    with _lock:
+        en_curso = _progreso.get(job_id)
+        if en_curso:
+            estado.update(en_curso)
+    return estado
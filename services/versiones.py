@@ -0,0 +1,22 @@
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from models import User
+
+# ETag débil a partir de users.data_version (ver services/cambios.py). Las partes extra
+# distinguen representaciones que cambian sin escrituras, como las que dependen del día.
+
+async def version_datos(db: AsyncSession, user_id: int) -> int:
+    version = (await db.execute(select(User.data_version).where(User.id == user_id))).scalar()
+    return version or 0
+
+def etag(version: int, *partes) -> str:
+    return 'W/"' + "-".join(str(p) for p in (version, *partes)) + '"'
+
+def no_modificado(if_none_match: str | None, valor: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # Comparación débil: se ignora el prefijo W/
+    candidatos = {e.strip().removeprefix("W/") for e in if_none_match.split(",")}
+    return valor.removeprefix("W/") in candidatos
@@ -0,0 +1,76 @@
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+from datetime import date, timedelta
+
+import pytest
+from sqlalchemy import create_engine
+
+# La app crea sus engines al importarse: las pruebas nunca deben tocar ./app.db
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'pruebas.db')}")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+DATOS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "datos")
+
+def sembrar(conn, user_id: int = 1, dias: int = 400, semilla: int = 7):
+    """Registros diarios alternos y metas de varios días por mes, hasta 60 días en el futuro."""
+    aleatorio = random.Random(semilla)
+    hoy = date.today()
+    for n in range(-60, dias):
+        fecha = (hoy - timedelta(days=n)).isoformat()
+        if n % 2 == 0:
+            conn.execute("INSERT INTO income VALUES (?, ?, ?)", (fecha, user_id, aleatorio.randint(100, 2000)))
+            conn.execute("INSERT INTO expenses VALUES (?, ?, ?, ?)",
+                         (fecha, user_id, aleatorio.randint(1, 300) + 0.25, aleatorio.choice(["ocio", "otros"])))
+        if n % 3 == 0:
+            conn.execute("INSERT INTO savings VALUES (?, ?, ?, ?)", (fecha, user_id, aleatorio.randint(1, 500), "general"))
+        if n % 5 == 0:
+            conn.execute("INSERT INTO investments VALUES (?, ?, ?, ?)", (fecha, user_id, aleatorio.randint(1, 900), "acciones"))
+        if n % 11 == 0:
+            for tabla in ("expense_goals", "saving_goals", "investment_goals"):
+                conn.execute(f"INSERT INTO {tabla} VALUES (?, ?, ?)", (fecha, user_id, aleatorio.randint(1, 100)))
+
+@pytest.fixture
+def base_inicial(tmp_path):
+    """Base SQLite con el esquema anterior a las migraciones versionadas y datos de dos usuarios."""
+    ruta = tmp_path / "inicial.db"
+    conn = sqlite3.connect(ruta)
+    with open(os.path.join(DATOS, "esquema_inicial.sql"), encoding="utf-8") as f:
+        conn.executescript(f.read())
+    for user_id in (1, 2):
+        conn.execute("INSERT INTO users VALUES (?, ?, ?, ?)", (user_id, f"u{user_id}@example.com", f"u{user_id}", "x"))
+        sembrar(conn, user_id, semilla=user_id)
+    conn.commit()
+    conn.close()
+    engine = create_engine(f"sqlite:///{ruta}")
+    yield engine
+    engine.dispose()
+
+@pytest.fixture(scope="session")
+def cliente():
+    """TestClient de la app sobre la base de DATABASE_URL, migrada y con datos del usuario 1."""
+    from fastapi.testclient import TestClient
+    from sqlalchemy.orm import Session
+    from db.db import engine
+    from db.migraciones import aplicar_migraciones
+    from services.rollup import reconstruir
+
+    aplicar_migraciones(engine)
+    conn = engine.raw_connection()
+    try:
+        for user_id in (1, 2, 3):
+            conn.execute("INSERT INTO users (id, email, username, password) VALUES (?, ?, ?, ?)",
+                         (user_id, f"u{user_id}@example.com", f"u{user_id}", "x"))
+        sembrar(conn, 1)
+        conn.commit()
+    finally:
+        conn.close()
+    with Session(engine) as db:
+        reconstruir(db, marcar=False)
+        db.commit()
+
+    from app import app
+    with TestClient(app) as cliente:
+        yield cliente
@@ -0,0 +1,70 @@
+-- Esquema creado por create_all antes de las migraciones versionadas (sin schema_version,
+-- índices, monthly_rollups, import_jobs ni users.data_version)
+CREATE TABLE users (
+	id INTEGER NOT NULL,
+	email VARCHAR NOT NULL,
+	username VARCHAR NOT NULL,
+	password VARCHAR NOT NULL,
+	PRIMARY KEY (id),
+	UNIQUE (email),
+	UNIQUE (username)
+);
+
+CREATE TABLE income (
+	date DATE NOT NULL,
+	user_id INTEGER NOT NULL,
+	amount FLOAT NOT NULL,
+	PRIMARY KEY (date, user_id),
+	FOREIGN KEY(user_id) REFERENCES users (id)
+);
+
+CREATE TABLE expenses (
+	date DATE NOT NULL,
+	user_id INTEGER NOT NULL,
+	amount FLOAT NOT NULL,
+	category VARCHAR,
+	PRIMARY KEY (date, user_id),
+	FOREIGN KEY(user_id) REFERENCES users (id)
+);
+
+CREATE TABLE savings (
+	date DATE NOT NULL,
+	user_id INTEGER NOT NULL,
+	amount FLOAT NOT NULL,
+	category VARCHAR,
+	PRIMARY KEY (date, user_id),
+	FOREIGN KEY(user_id) REFERENCES users (id)
+);
+
+CREATE TABLE investments (
+	date DATE NOT NULL,
+	user_id INTEGER NOT NULL,
+	amount FLOAT NOT NULL,
+	category VARCHAR,
+	PRIMARY KEY (date, user_id),
+	FOREIGN KEY(user_id) REFERENCES users (id)
+);
+
+CREATE TABLE expense_goals (
+	date DATE NOT NULL,
+	user_id INTEGER NOT NULL,
+	value FLOAT NOT NULL,
+	PRIMARY KEY (date, user_id),
+	FOREIGN KEY(user_id) REFERENCES users (id)
+);
+
+CREATE TABLE saving_goals (
+	date DATE NOT NULL,
+	user_id INTEGER NOT NULL,
+	value FLOAT NOT NULL,
+	PRIMARY KEY (date, user_id),
+	FOREIGN KEY(user_id) REFERENCES users (id)
+);
+
+CREATE TABLE investment_goals (
+	date DATE NOT NULL,
+	user_id INTEGER NOT NULL,
+	value FLOAT NOT NULL,
+	PRIMARY KEY (date, user_id),
+	FOREIGN KEY(user_id) REFERENCES users (id)
+);
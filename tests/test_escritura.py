@@ -0,0 +1,69 @@
+from datetime import date
+
+import pytest
+from sqlalchemy import create_engine, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from models import Base, Expense, SavingGoal
+from services.escritura import combinar_duplicados, insertar_muchos, sentencia_insert
+
+DIA = date(2024, 3, 1)
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine, tables=[Expense.__table__, SavingGoal.__table__])
+    with Session(engine) as sesion:
+        sesion.execute(sentencia_insert(sesion, Expense), [{"user_id": 1, "date": DIA, "amount": 10.0, "category": "ocio"}])
+        sesion.execute(sentencia_insert(sesion, SavingGoal), [{"user_id": 1, "date": DIA, "value": 100.0}])
+        yield sesion
+    engine.dispose()
+
+def _gasto(db):
+    fila = db.execute(select(Expense.amount, Expense.category).where(Expense.user_id == 1, Expense.date == DIA)).one()
+    return tuple(fila)
+
+@pytest.mark.parametrize("conflicto, esperado", [
+    ("omitir", (10.0, "ocio")),
+    ("sobrescribir", (5.0, "otros")),
+    ("sumar", (15.0, "ocio")),
+])
+def test_politicas_de_conflicto(db, conflicto, esperado):
+    nuevas = [
+        {"user_id": 1, "date": DIA, "amount": 5.0, "category": "otros"},
+        {"user_id": 1, "date": date(2024, 3, 2), "amount": 1.0, "category": "otros"},
+    ]
+    assert insertar_muchos(db, Expense, nuevas, conflicto) == 2
+    assert _gasto(db) == esperado
+    assert db.scalar(select(Expense.amount).where(Expense.date == date(2024, 3, 2))) == 1.0
+
+def test_conflicto_error_no_escribe_duplicados(db):
+    with pytest.raises(IntegrityError):
+        insertar_muchos(db, Expense, [{"user_id": 1, "date": DIA, "amount": 5.0, "category": "otros"}])
+
+def test_sumar_acumula_el_valor_de_las_metas(db):
+    insertar_muchos(db, SavingGoal, [{"user_id": 1, "date": DIA, "value": 50.0}], "sumar")
+    assert db.scalar(select(SavingGoal.value)) == 150.0
+
+def test_conflicto_no_soportado():
+    with pytest.raises(ValueError):
+        sentencia_insert(None, Expense, "otro")
+
+@pytest.mark.parametrize("conflicto, esperado", [
+    ("error", [1.0, 2.0, 4.0]),
+    ("omitir", [1.0, 4.0]),
+    ("sobrescribir", [2.0, 4.0]),
+    ("sumar", [3.0, 4.0]),
+])
+def test_combinar_duplicados_dentro_del_lote(conflicto, esperado):
+    filas = [
+        {"user_id": 1, "date": DIA, "amount": 1.0},
+        {"user_id": 1, "date": DIA, "amount": 2.0},
+        {"user_id": 1, "date": date(2024, 3, 2), "amount": 4.0},
+    ]
+    assert [f["amount"] for f in combinar_duplicados(Expense, filas, conflicto)] == esperado
+
+def test_dos_fechas_repetidas_en_el_mismo_lote_se_suman(db):
+    nuevas = [{"user_id": 1, "date": DIA, "amount": 1.0, "category": "x"}] * 2
+    assert insertar_muchos(db, Expense, nuevas, "sumar") == 1
+    assert _gasto(db) == (12.0, "ocio")
@@ -0,0 +1,65 @@
+from datetime import date, timedelta
+
+from sqlalchemy import select
+from models import Expense
+from services.paginacion import CABECERA_CURSOR
+
+def test_etag_y_304_del_historico(cliente):
+    primera = cliente.get("/history/expense/1?periodo=6m")
+    assert primera.status_code == 200
+    etag = primera.headers["ETag"]
+
+    # Desde la caché y recalculado: mismo ETag, 304 sin cuerpo
+    repetida = cliente.get("/history/expense/1?periodo=6m", headers={"If-None-Match": etag})
+    assert repetida.status_code == 304 and repetida.content == b""
+    assert cliente.get("/history/expense/1?periodo=1y", headers={"If-None-Match": etag}).status_code == 304
+
+    ayer = date.today() - timedelta(days=1)
+    creado = cliente.post("/datos/lote/1", json={"operaciones": [
+        {"op": "crear", "tipo": "expense", "date": str(ayer), "amount": 7, "category": "otros", "upsert": True},
+    ]})
+    assert creado.status_code == 200
+
+    # La escritura invalida la caché y cambia el ETag
+    tras_escribir = cliente.get("/history/expense/1?periodo=6m", headers={"If-None-Match": etag})
+    assert tras_escribir.status_code == 200
+    assert tras_escribir.headers["ETag"] != etag
+    assert tras_escribir.json() != primera.json()
+
+def test_el_etag_es_por_usuario(cliente):
+    etag_1 = cliente.get("/history/income/1").headers["ETag"]
+    cliente.post("/datos/lote/2", json={"operaciones": [
+        {"op": "crear", "tipo": "income", "date": str(date.today()), "amount": 1, "upsert": True},
+    ]})
+    assert cliente.get("/history/income/1", headers={"If-None-Match": etag_1}).status_code == 304
+
+def test_listado_por_cursor_recorre_todas_las_filas(cliente):
+    from db.db import SessionLocal
+    fechas, cursor, paginas = [], None, 0
+    while True:
+        params = {"limit": 37, **({"cursor": cursor} if cursor else {})}
+        respuesta = cliente.get("/datos/gastos/1", params=params)
+        assert respuesta.status_code == 200
+        pagina = respuesta.json()
+        assert len(pagina) <= 37
+        fechas += [fila["date"] for fila in pagina]
+        paginas += 1
+        cursor = respuesta.headers.get(CABECERA_CURSOR)
+        if cursor is None:
+            break
+        assert cursor == pagina[-1]["date"]
+
+    with SessionLocal() as db:
+        esperado = [str(f) for f in db.scalars(select(Expense.date).where(Expense.user_id == 1).order_by(Expense.date))]
+    assert fechas == esperado
+    assert paginas == len(esperado) // 37 + 1
+
+def test_listado_por_cursor_con_filtros(cliente):
+    desde, hasta = date.today() - timedelta(days=100), date.today() - timedelta(days=10)
+    primera = cliente.get("/datos/gastos/1", params={"limit": 5, "desde": str(desde), "hasta": str(hasta)})
+    segunda = cliente.get("/datos/gastos/1", params={
+        "limit": 5, "desde": str(desde), "hasta": str(hasta), "cursor": primera.headers[CABECERA_CURSOR],
+    })
+    fechas = [f["date"] for f in primera.json() + segunda.json()]
+    assert fechas == sorted(set(fechas))
+    assert all(str(desde) <= f <= str(hasta) for f in fechas)
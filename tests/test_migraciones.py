@@ -0,0 +1,74 @@
+import os
+import subprocess
+import sys
+
+import pytest
+from sqlalchemy import inspect, text
+from sqlalchemy.orm import Session
+from db.migraciones import aplicar_migraciones, ultima_version, version_actual
+from services.rollup import verificar
+
+def test_migra_una_base_creada_antes_de_las_migraciones(base_inicial):
+    aplicadas = aplicar_migraciones(base_inicial)
+
+    assert [version for version, _ in aplicadas] == list(range(1, ultima_version() + 1))
+    with base_inicial.connect() as conn:
+        assert version_actual(conn) == ultima_version()
+        assert "data_version" in {c["name"] for c in inspect(conn).get_columns("users")}
+        assert conn.execute(text("SELECT DISTINCT data_version FROM users")).scalars().all() == [0]
+    with Session(base_inicial) as db:
+        assert verificar(db) == []
+
+TABLAS_DATOS = ["users", "income", "expenses", "savings", "investments",
+                "expense_goals", "saving_goals", "investment_goals"]
+
+def _contenido(engine):
+    with engine.connect() as conn:
+        return {
+            tabla: conn.execute(text(
+                f"SELECT {'id, email, username, password' if tabla == 'users' else '*'} FROM {tabla} ORDER BY 1, 2"
+            )).all()
+            for tabla in TABLAS_DATOS
+        }
+
+def test_la_migracion_conserva_los_datos(base_inicial):
+    antes = _contenido(base_inicial)
+    aplicar_migraciones(base_inicial)
+    assert _contenido(base_inicial) == antes
+
+def test_migraciones_por_etapas_e_idempotentes(base_inicial, monkeypatch):
+    import db.migraciones as migraciones
+    todas = list(migraciones.MIGRACIONES)
+
+    # Una base que se quedó en la versión 2 y luego se actualiza al resto
+    monkeypatch.setattr(migraciones, "MIGRACIONES", [m for m in todas if m[0] <= 2])
+    assert [v for v, _ in aplicar_migraciones(base_inicial)] == [1, 2]
+    monkeypatch.setattr(migraciones, "MIGRACIONES", todas)
+    assert [v for v, _ in aplicar_migraciones(base_inicial)] == list(range(3, ultima_version() + 1))
+
+    assert aplicar_migraciones(base_inicial) == []
+    assert migraciones.comprobar_esquema(base_inicial) == ultima_version()
+    with base_inicial.connect() as conn:
+        indices = {i["name"] for i in inspect(conn).get_indexes("expenses")}
+        assert "ix_expenses_user_id_date" in indices
+        assert {"monthly_rollups", "import_jobs", "schema_version"} <= set(inspect(conn).get_table_names())
+
+def test_arranque_falla_si_faltan_migraciones(base_inicial, monkeypatch):
+    import db.migraciones as migraciones
+    monkeypatch.setattr(migraciones, "MIGRACIONES_AL_ARRANCAR", False)
+    with pytest.raises(RuntimeError, match="python -m db.migraciones actualizar"):
+        migraciones.comprobar_esquema(base_inicial)
+
+def test_cli_actualizar(base_inicial):
+    raiz = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    entorno = dict(os.environ, DATABASE_URL=str(base_inicial.url))
+    salida = subprocess.run(
+        [sys.executable, "-m", "db.migraciones", "actualizar"],
+        cwd=raiz, env=entorno, capture_output=True, text=True, check=True,
+    ).stdout
+    assert f"Esquema en la versión {ultima_version()} ({ultima_version()} migraciones aplicadas)." in salida
+    estado = subprocess.run(
+        [sys.executable, "-m", "db.migraciones", "estado"],
+        cwd=raiz, env=entorno, capture_output=True, text=True, check=True,
+    ).stdout
+    assert f"Versión actual: {ultima_version()}." in estado
@@ -0,0 +1,79 @@
+import asyncio
+import random
+from datetime import date, timedelta
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from sqlalchemy.orm import Session
+from db.migraciones import aplicar_migraciones
+from routes.finance_history import leer_rollup, ultimo_dia
+from services.rollup import TIPOS_ROLLUP, verificar
+
+def _por_mes(db, user_id, tipo, desde, hasta):
+    # Totales mensuales calculados directamente sobre la tabla base
+    model, campo = TIPOS_ROLLUP[tipo]
+    consulta = select(model.date, getattr(model, campo)).where(model.user_id == user_id, model.date >= desde)
+    if hasta is not None:
+        consulta = consulta.where(model.date <= hasta)
+    totales = {}
+    for fecha, valor in db.execute(consulta.order_by(model.date)):
+        mes = f"{fecha.year}-{fecha.month:02d}"
+        # Metas: vale la última del mes dentro del rango
+        totales[mes] = valor if campo == "value" else totales.get(mes, 0) + valor
+    return {mes: round(total, 6) for mes, total in totales.items()}
+
+def _rangos(cantidad: int, semilla: int = 3):
+    aleatorio = random.Random(semilla)
+    hoy = date.today()
+    for _ in range(cantidad):
+        desde = hoy - timedelta(days=aleatorio.randint(-30, 420))
+        if aleatorio.random() < 0.3:
+            desde = desde.replace(day=1)
+        hasta = None if aleatorio.random() < 0.3 else desde + timedelta(days=aleatorio.randint(0, 200))
+        if hasta is not None and aleatorio.random() < 0.3:
+            hasta = ultimo_dia(hasta)
+        yield desde, hasta
+
+def test_rollup_igual_a_las_tablas_base(base_inicial):
+    aplicar_migraciones(base_inicial)
+    with Session(base_inicial) as db:
+        assert verificar(db) == []
+
+def test_leer_rollup_igual_a_sumar_las_tablas_base(base_inicial):
+    aplicar_migraciones(base_inicial)
+    async_engine = create_async_engine(str(base_inicial.url).replace("sqlite://", "sqlite+aiosqlite://"))
+    tipos = list(TIPOS_ROLLUP)
+
+    async def comparar():
+        async with AsyncSession(async_engine) as adb:
+            for desde, hasta in _rangos(60):
+                leido = await leer_rollup(adb, 1, tipos, desde, hasta)
+                for tipo in tipos:
+                    esperado = _por_mes(db, 1, tipo, desde, hasta)
+                    obtenido = {mes: round(total, 6) for mes, total in leido[tipo].items()}
+                    assert obtenido == esperado, (tipo, desde, hasta)
+        await async_engine.dispose()
+
+    with Session(base_inicial) as db:
+        asyncio.run(comparar())
+
+@pytest.mark.parametrize("peticion", [
+    lambda c: c.post("/datos/gastos/1?upsert=true", json={"user_id": 1, "expense_date": str(date.today() - timedelta(days=1)),
+                                             "amount": 1, "category": "vivienda"}),
+    lambda c: c.delete(f"/datos/gastos/1/{date.today() - timedelta(days=2)}"),
+    lambda c: c.post("/datos/lote/1", json={"operaciones": [
+        {"op": "crear", "tipo": "income", "date": str(date.today() - timedelta(days=3)), "amount": 0},
+        {"op": "actualizar", "tipo": "saving", "date": str(date.today()), "amount": 9.5},
+        {"op": "eliminar", "tipo": "investment", "date": str(date.today() - timedelta(days=5))},
+    ]}),
+    lambda c: c.post("/api/importacion/importar", data={"tipo": "expense", "user_id": 1, "conflicto": "sumar"},
+                     files={"file": ("g.csv", "date,amount,category\n" + "".join(
+                         f"{date.today() - timedelta(days=d)},{d},otros\n" for d in range(0, 90, 4)))}),
+])
+def test_las_escrituras_mantienen_el_rollup(cliente, peticion):
+    from db.db import SessionLocal
+    respuesta = peticion(cliente)
+    assert respuesta.status_code == 200, respuesta.text
+    with SessionLocal() as db:
+        assert verificar(db) == []
@@ -0,0 +1,54 @@
+import multiprocessing
+import os
+import socket
+from datetime import datetime, timedelta
+
+from sqlalchemy.orm import Session
+from db.migraciones import aplicar_migraciones
+from models import ImportJob
+from services import trabajos_importacion
+from services.trabajos_importacion import expirar_huerfanos, propietario
+
+def _proceso_terminado() -> str:
+    proceso = multiprocessing.get_context("fork").Process(target=int)
+    proceso.start()
+    proceso.join()
+    # Mismo formato que propietario(); el pid ya no existe
+    return f"{socket.gethostname()}:{proceso.pid}:1"
+
+def test_solo_expira_los_trabajos_cuyo_propietario_termino(base_inicial):
+    aplicar_migraciones(base_inicial)
+    ahora = datetime.utcnow()
+    antiguo = ahora - timedelta(seconds=trabajos_importacion.LATIDO_CADUCA + 60)
+    padre = os.getppid()
+    trabajos = {
+        "propio": dict(propietario=propietario(), latido=antiguo),
+        "otro_worker": dict(
+            propietario=f"{socket.gethostname()}:{padre}:{trabajos_importacion._inicio_proceso(padre)}", latido=antiguo
+        ),
+        "terminado": dict(propietario=_proceso_terminado(), latido=ahora),
+        "otra_maquina_viva": dict(propietario="otra-maquina:1:1", latido=ahora),
+        "otra_maquina_caida": dict(propietario="otra-maquina:1:1", latido=antiguo),
+        "sin_propietario_reciente": dict(propietario=None, actualizado=ahora),
+        "sin_propietario_antiguo": dict(propietario=None, actualizado=antiguo),
+    }
+    with Session(base_inicial) as db:
+        ids = {}
+        for nombre, campos in trabajos.items():
+            job = ImportJob(user_id=1, tipo="expense", conflicto="error", estado="procesando", **campos)
+            db.add(job)
+            db.flush()
+            ids[nombre] = job.id
+        db.commit()
+
+        assert expirar_huerfanos(db) == 3
+        estados = {nombre: db.get(ImportJob, job_id).estado for nombre, job_id in ids.items()}
+    assert estados == {
+        "propio": "procesando",
+        "otro_worker": "procesando",
+        "terminado": "error",
+        "otra_maquina_viva": "procesando",
+        "otra_maquina_caida": "error",
+        "sin_propietario_reciente": "procesando",
+        "sin_propietario_antiguo": "error",
+    }